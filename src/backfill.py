@@ -0,0 +1,135 @@
+"""
+resumable backfill runner. items come a page at a time from a keyset source (supabase_source walks a table
+ordered by a unique key, list_source a sorted in-memory list); each page is processed by a bounded thread
+pool, its results are flushed in one bulk call, and only then is the page's last key checkpointed to
+data/backfill/<name>.json. a crashed run picks up after the last flushed page; a finished run removes its
+checkpoint so the next one starts a fresh pass. upstream calls made through http_client share its rate limits.
+"""
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+VERBOSE = True
+
+CHECKPOINT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "backfill"))
+DEFAULT_WORKERS = 8
+DEFAULT_PAGE_SIZE = 200
+MAX_FAILED_KEYS = 500
+
+SKIP = object()  # return from process() when there is nothing to write for an item
+
+
+def supabase_source(supabase, table, columns, key, apply_filters=None):
+    # Keyset pagination: WHERE key > after ORDER BY key LIMIT n, so pages stay cheap however deep we are
+    def fetch_page(after, limit):
+        query = supabase.table(table).select(columns)
+        if apply_filters:
+            query = apply_filters(query)
+        if after is not None:
+            query = query.gt(key, after)
+        return query.order(key).limit(limit).execute().data
+    return fetch_page
+
+
+def list_source(items, key_fn=lambda item: item):
+    ordered = sorted(set(items), key=key_fn)
+
+    def fetch_page(after, limit):
+        remaining = ordered if after is None else [i for i in ordered if key_fn(i) > after]
+        return remaining[:limit]
+    return fetch_page
+
+
+def checkpoint_path(name):
+    return os.path.join(CHECKPOINT_DIR, f"{name}.json")
+
+
+def load_checkpoint(name):
+    try:
+        with open(checkpoint_path(name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(name, state):
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=CHECKPOINT_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, checkpoint_path(name))
+
+
+def clear_checkpoint(name):
+    try:
+        os.remove(checkpoint_path(name))
+    except FileNotFoundError:
+        pass
+
+
+def run_backfill(name, fetch_page, key_fn, process, flush, workers=DEFAULT_WORKERS,
+                 page_size=DEFAULT_PAGE_SIZE, restart=False, limit=None):
+    # fetch_page(after_key, limit) -> items ordered by key_fn; process(item) -> result, SKIP, or raises;
+    # flush(results) writes a page's results in bulk. Returns the final counters.
+    if restart:
+        clear_checkpoint(name)
+    state = load_checkpoint(name) or {"after": None, "processed": 0, "written": 0, "skipped": 0,
+                                      "failed": 0, "failed_keys": []}
+    if VERBOSE and state["after"] is not None:
+        print(f"[BACKFILL] {name}: resuming after {state['after']!r} ({state['processed']} done before)")
+
+    start = time.perf_counter()
+    processed_this_run = 0
+
+    def attempt(item):
+        try:
+            return process(item), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"backfill-{name}") as pool:
+        while limit is None or processed_this_run < limit:
+            size = page_size if limit is None else min(page_size, limit - processed_this_run)
+            page = fetch_page(state["after"], size)
+            if not page:
+                clear_checkpoint(name)
+                break
+
+            results = []
+            for item, (result, error) in zip(page, pool.map(attempt, page)):
+                if error is not None:
+                    state["failed"] += 1
+                    if len(state["failed_keys"]) < MAX_FAILED_KEYS:
+                        state["failed_keys"].append(key_fn(item))
+                    if VERBOSE:
+                        print(f"[ERROR] {name}: {key_fn(item)!r} failed: {error}")
+                elif result is SKIP or result is None:
+                    state["skipped"] += 1
+                else:
+                    results.append(result)
+
+            # Flush before checkpointing: a crash in between redoes the page instead of losing it
+            if results:
+                flush(results)
+                state["written"] += len(results)
+            state["processed"] += len(page)
+            state["after"] = key_fn(page[-1])
+            save_checkpoint(name, state)
+
+            processed_this_run += len(page)
+            if VERBOSE:
+                elapsed = time.perf_counter() - start
+                print(
+                    f"[BACKFILL] {name}: {state['processed']} processed ({state['written']} written, "
+                    f"{state['skipped']} skipped, {state['failed']} failed) — "
+                    f"{processed_this_run / elapsed:.1f} items/s"
+                )
+            if len(page) < size:
+                clear_checkpoint(name)
+                break
+
+    if VERBOSE:
+        print(f"[BACKFILL] {name}: done, {processed_this_run} items in {time.perf_counter() - start:.1f}s")
+    return state
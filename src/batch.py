@@ -0,0 +1,214 @@
+"""
+batch mode for offline jobs (content planning, evaluation, cache warming): reads prompts from a JSONL file, runs
+them concurrently in one event loop and writes one JSONL result per prompt. candidate lookups are shared across
+the whole batch through SharedEnrichment, so a title that shows up for twenty prompts is searched and enriched
+once and upstream calls grow with the number of unique movies, not prompts x candidates. failed or degraded
+lookups are not kept, so a transient error doesn't make a title unresolvable for the rest of the batch.
+
+input lines are {"prompt": "...", "id": "...", "budget_seconds": 20} (id and budget optional) or a bare JSON
+string; output lines are {"id", "line", "prompt", "ok", "ms", "result" | "error"} in completion order.
+
+    python batch.py prompts.jsonl                               # -> prompts.results.jsonl
+    python batch.py prompts.jsonl --parallelism=16 --output=out.jsonl --budget=30 --quiet
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import deadline
+import http_client
+import metrics
+import movie_store
+import poster_store
+import production_v1
+import provider_cache
+import retry_policy
+import tracing
+from singleflight import normalize
+
+VERBOSE = True
+
+DEFAULT_PARALLELISM = 8
+# Nobody is waiting on a batch, so each prompt gets a longer budget than an interactive request
+DEFAULT_BUDGET_SECONDS = 30.0
+
+
+def _copy(value):
+    # Every prompt gets its own dict; the pipeline adds fields to the movies it keeps
+    return dict(value) if isinstance(value, dict) else value
+
+
+def _found(tmdb_id):
+    # search_tmdb_id returns None for a miss and for a failed lookup alike, so None is never kept
+    return tmdb_id is not None
+
+
+def _complete(movie):
+    # Not kept: "TMDb not found" stubs (also what a failed lookup gives), rows fetched under skip_omdb and rows
+    # whose OMDb call failed; all of those lack ratings or a tmdb_id
+    return bool(movie and movie.get("tmdb_id") and "imdb_rating" in movie)
+
+
+class SharedEnrichment:
+    # Batch-wide memo of good candidate lookups, so later prompts reuse them. Prompts asking while a lookup is
+    # running already share it through single_flight in production_v1 (deadline-aware, see singleflight.py);
+    # this only keeps what came back, and only if keep() says it's a real answer.
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.fetched = 0
+
+    def _shared(self, key, fetch, keep, *args):
+        with self._lock:
+            self.requested += 1
+            if key in self._results:
+                return _copy(self._results[key])
+            self.fetched += 1
+        result = fetch(*args)
+        if keep(result):
+            with self._lock:
+                self._results[key] = result
+        return _copy(result)
+
+    def search_tmdb_id(self, title):
+        return self._shared(("search", normalize(title)), production_v1.search_tmdb_id, _found, title)
+
+    def get_combined_data(self, title, tmdb_id=None):
+        key = ("tmdb_id", normalize(tmdb_id)) if tmdb_id else ("title", normalize(title))
+        return self._shared(key, production_v1.get_combined_data, _complete, title, tmdb_id)
+
+    def stats(self):
+        with self._lock:
+            return {"requested": self.requested, "fetched": self.fetched, "reused": self.requested - self.fetched}
+
+
+def read_prompts(path):
+    prompts = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise SystemExit(f"{path}:{line_no}: not JSON ({e})")
+            if isinstance(entry, str):
+                entry = {"prompt": entry}
+            prompt = (entry.get("prompt") or "").strip() if isinstance(entry, dict) else ""
+            if not prompt:
+                raise SystemExit(f"{path}:{line_no}: missing prompt")
+            prompts.append({**entry, "prompt": prompt, "line": line_no})
+    return prompts
+
+
+async def run_one(entry, enrichment, slots, budget_seconds):
+    async with slots:
+        start = time.perf_counter()
+        output = {"id": entry.get("id"), "line": entry["line"], "prompt": entry["prompt"]}
+        try:
+            output["result"] = await production_v1.recommend_movies_from_prompt_async(
+                entry["prompt"], budget_seconds=float(entry.get("budget_seconds") or budget_seconds),
+                enrichment=enrichment,
+            )
+            output["ok"] = True
+        except Exception as e:
+            if VERBOSE:
+                print(f"[ERROR] Recommendation failed for {entry['prompt']!r}: {e}")
+            output["ok"] = False
+            output["error"] = f"{type(e).__name__}: {e}"
+        output["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return output
+
+
+async def run_batch(prompts, output_path, parallelism=DEFAULT_PARALLELISM, budget_seconds=DEFAULT_BUDGET_SECONDS):
+    loop = asyncio.get_running_loop()
+    # Same reasoning as the service: asyncio.to_thread's stock executor (cpus + 4) would cap the parallelism
+    executor = ThreadPoolExecutor(max_workers=max(32, parallelism * 4), thread_name_prefix="batch")
+    loop.set_default_executor(executor)
+    await asyncio.to_thread(production_v1.warm_caches)
+
+    enrichment = SharedEnrichment()
+    slots = asyncio.Semaphore(parallelism)
+    upstream_before = metrics.UPSTREAM_REQUESTS.total()
+    start = time.perf_counter()
+    failed = 0
+    tasks = [asyncio.create_task(run_one(entry, enrichment, slots, budget_seconds)) for entry in prompts]
+    try:
+        with open(output_path, "w") as out:
+            for done, next_done in enumerate(asyncio.as_completed(tasks), 1):
+                output = await next_done
+                failed += not output["ok"]
+                out.write(json.dumps(output, default=str) + "\n")
+                out.flush()
+                if VERBOSE:
+                    status = "ok" if output["ok"] else output["error"]
+                    print(f"[BATCH] {done}/{len(prompts)} {output['ms']:>8.1f} ms  {output['prompt']!r}: {status}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        "prompts": len(prompts),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 1),
+        "enrichment": enrichment.stats(),
+        "upstream_requests": metrics.UPSTREAM_REQUESTS.total() - upstream_before,
+    }
+
+
+def parse_args(argv):
+    options = {"input": None, "output": None, "parallelism": DEFAULT_PARALLELISM,
+               "budget": DEFAULT_BUDGET_SECONDS, "quiet": False}
+    for arg in argv:
+        if not arg.startswith("-"):
+            options["input"] = arg
+            continue
+        name, _, value = arg.lstrip("-").partition("=")
+        if name == "quiet":
+            options["quiet"] = True
+        elif name == "parallelism":
+            options["parallelism"] = max(1, int(value))
+        elif name == "budget":
+            options["budget"] = float(value)
+        elif name == "output":
+            options["output"] = value
+        else:
+            raise SystemExit(f"Unknown option {arg!r}")
+    if not options["input"]:
+        raise SystemExit("usage: python batch.py prompts.jsonl [--output=...] [--parallelism=N] [--budget=S] [--quiet]")
+    if not options["output"]:
+        options["output"] = os.path.splitext(options["input"])[0] + ".results.jsonl"
+    return options
+
+
+def main(argv=None):
+    global VERBOSE
+    options = parse_args(sys.argv[1:] if argv is None else argv)
+    if options["quiet"]:
+        # Only the final summary is printed
+        VERBOSE = False
+        for module in (production_v1, deadline, retry_policy, movie_store, provider_cache, poster_store, metrics,
+                       http_client, tracing):
+            module.VERBOSE = False
+    prompts = read_prompts(options["input"])
+    # Keeps the local movie replica current for the length of the batch
+    production_v1.movie_store.start_syncer()
+    try:
+        summary = asyncio.run(run_batch(prompts, options["output"], options["parallelism"], options["budget"]))
+    finally:
+        production_v1.movie_store.stop_syncer()
+    shared = summary["enrichment"]
+    print(f"[BATCH] {summary['prompts']} prompts ({summary['failed']} failed) in {summary['seconds']}s "
+          f"-> {options['output']}")
+    print(f"[BATCH] Candidate lookups: {shared['requested']} requested, {shared['fetched']} fetched, "
+          f"{shared['reused']} shared across prompts; {summary['upstream_requests']} upstream HTTP requests")
+
+
+if __name__ == "__main__":
+    main()
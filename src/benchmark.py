@@ -0,0 +1,257 @@
+"""
+end-to-end latency benchmark for recommend_movies_from_prompt, run against the offline stand-ins (standins.py)
+so numbers are repeatable and cost nothing. a fixed corpus of prompts covers the shapes users send; each run
+records per-stage wall times, upstream calls per prompt and cache hit rates, and the summary (p50/p95/p99 by
+stage) is written as JSON so two runs can be compared.
+
+    python benchmark.py                          # 3 rounds over the corpus, warm caches
+    python benchmark.py --rounds=5 --cold        # clear in-process caches before every prompt
+    python benchmark.py --latency-scale=0        # pipeline overhead only, no simulated network
+    python benchmark.py --compare=data/benchmarks/old.json
+"""
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+VERBOSE = True
+
+BENCHMARK_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "benchmarks"))
+DEFAULT_ROUNDS = 3
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# (kind, prompt) -- kept fixed so runs stay comparable; add new prompts at the end
+CORPUS = [
+    ("title", "Interstellar"),
+    ("title", "The Godfather"),
+    ("title", "something like Alien: Romulus"),
+    ("genre", "a good horror movie"),
+    ("genre", "funny animated movies for kids"),
+    ("genre", "highly rated thrillers"),
+    ("keyword", "movies about space exploration and time travel"),
+    ("keyword", "war movies about loss and survival"),
+    ("keyword", "a heist movie with a twist ending"),
+    ("platform", "best comedies on Netflix"),
+    ("platform", "sci-fi on Hulu or Prime"),
+    ("platform", "horror from 2023 on Max"),
+    ("fallback", "qwzx blorptang"),
+    ("fallback", "that one movie with the guy"),
+]
+
+
+def percentile(values, q):
+    # Nearest-rank percentile; None for no samples
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(values):
+    summary = {f"p{int(q * 100)}": percentile(values, q) for q in PERCENTILES}
+    summary["mean"] = round(sum(values) / len(values), 1) if values else None
+    summary["n"] = len(values)
+    return summary
+
+
+def _cache_stats(p):
+    return {
+        "discover": p.discover_cache.stats(),
+        "providers": p.provider_cache.stats(),
+        "movies": p.movie_store.lru.stats(),
+    }
+
+
+def _hit_rate(before, after):
+    hits = after["hits"] - before["hits"]
+    total = hits + after["misses"] - before["misses"]
+    return round(hits / total, 3) if total else None
+
+
+def reset_caches(p):
+    p.discover_cache.clear()
+    p.provider_cache.clear()
+    p.movie_store.clear()
+
+
+def run_prompt(p, standins, kind, prompt):
+    calls_before = standins.standin_stats()
+    caches_before = _cache_stats(p)
+    start = time.perf_counter()
+    error = None
+    result = {}
+    try:
+        result = asyncio.run(p.recommend_movies_from_prompt_async(prompt))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    total_ms = round((time.perf_counter() - start) * 1000, 1)
+    calls_after = standins.standin_stats()
+    caches_after = _cache_stats(p)
+    return {
+        "kind": kind,
+        "prompt": prompt,
+        "total_ms": total_ms,
+        "error": error,
+        "used_fallback": result.get("used_fallback"),
+        "movies": len(result.get("top_movies") or []),
+        "degradations": result.get("degradations") or [],
+        "stages_ms": {stage: t["wall_ms"] for stage, t in (result.get("timings") or {}).items()},
+        "upstream_calls": {
+            service: count - calls_before.get(service, 0)
+            for service, count in calls_after.items() if count - calls_before.get(service, 0)
+        },
+        "cache_hit_rate": {name: _hit_rate(caches_before[name], caches_after[name]) for name in caches_after},
+    }
+
+
+def summarize_runs(runs):
+    # Stages in pipeline order
+    stages = list(dict.fromkeys(stage for run in runs for stage in run["stages_ms"]))
+    services = sorted({service for run in runs for service in run["upstream_calls"]})
+    by_kind = {}
+    for run in runs:
+        by_kind.setdefault(run["kind"], []).append(run["total_ms"])
+    return {
+        "total_ms": summarize([run["total_ms"] for run in runs]),
+        "total_ms_by_kind": {kind: summarize(values) for kind, values in by_kind.items()},
+        "stages_ms": {
+            stage: summarize([run["stages_ms"][stage] for run in runs if run["stages_ms"].get(stage) is not None])
+            for stage in stages
+        },
+        "upstream_calls_per_prompt": {
+            service: round(sum(run["upstream_calls"].get(service, 0) for run in runs) / len(runs), 2)
+            for service in services
+        },
+        "errors": sum(1 for run in runs if run["error"]),
+        "fallbacks": sum(1 for run in runs if run["used_fallback"]),
+    }
+
+
+def run_benchmark(rounds=DEFAULT_ROUNDS, cold=False, latency_scale=None, error_rate=None, seed=None):
+    # The stand-ins have to be selected before production_v1 is imported
+    os.environ["MOVIEMATCH_STANDINS"] = "1"
+    for name, value in (("LATENCY_SCALE", latency_scale), ("ERROR_RATE", error_rate), ("SEED", seed)):
+        if value is not None:
+            os.environ[f"MOVIEMATCH_STANDIN_{name}"] = str(value)
+    import production_v1 as p
+    import standins
+    from http_client import http_stats
+
+    p.VERBOSE = False
+    started_at = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    runs = []
+    for round_no in range(1, rounds + 1):
+        for kind, prompt in CORPUS:
+            if cold:
+                reset_caches(p)
+            run = run_prompt(p, standins, kind, prompt)
+            run["round"] = round_no
+            runs.append(run)
+            if VERBOSE:
+                status = run["error"] or f"{run['movies']} movies{' (fallback)' if run['used_fallback'] else ''}"
+                print(f"[BENCH] r{round_no} {kind:<8} {run['total_ms']:>8.1f} ms  {prompt!r}: {status}")
+
+    return {
+        "started_at": started_at,
+        "seconds": round(time.perf_counter() - start, 1),
+        "config": {
+            "rounds": rounds,
+            "cold": cold,
+            "corpus_size": len(CORPUS),
+            "latency_scale": float(os.getenv("MOVIEMATCH_STANDIN_LATENCY_SCALE", 1.0)),
+            "error_rate": float(os.getenv("MOVIEMATCH_STANDIN_ERROR_RATE", 0.0)),
+            "seed": int(os.getenv("MOVIEMATCH_STANDIN_SEED", 7)),
+        },
+        "summary": summarize_runs(runs),
+        "caches": _cache_stats(p),
+        "upstreams": http_stats(),
+        "runs": runs,
+    }
+
+
+def save_results(results, path=None):
+    if path is None:
+        os.makedirs(BENCHMARK_DIR, exist_ok=True)
+        path = os.path.join(BENCHMARK_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def _row(name, s):
+    # Percentiles are None for stages no run reached
+    return f"{name:<16}" + "".join(f"{'-' if s[key] is None else s[key]:>10}" for key in ("p50", "p95", "p99"))
+
+
+def print_summary(results):
+    summary = results["summary"]
+    print(f"\n====== BENCHMARK ({results['config']['rounds']} rounds x {results['config']['corpus_size']} prompts) ======")
+    print(f"{'':<16}{'p50':>10}{'p95':>10}{'p99':>10}")
+    print(_row("total", summary["total_ms"]))
+    for stage, s in summary["stages_ms"].items():
+        print(_row(stage, s))
+    for kind, s in summary["total_ms_by_kind"].items():
+        print(_row("  " + kind, s))
+    calls = ", ".join(f"{service} {n}" for service, n in summary["upstream_calls_per_prompt"].items())
+    print(f"[BENCH] Upstream calls per prompt: {calls}")
+    hit_rates = ", ".join(
+        f"{name} {'-' if c['hit_rate'] is None else format(c['hit_rate'], '.0%')}" for name, c in results["caches"].items())
+    print(f"[BENCH] Cache hit rates: {hit_rates}")
+    print(f"[BENCH] {summary['errors']} errors, {summary['fallbacks']} fallbacks in {results['seconds']}s")
+
+
+def compare(old, new):
+    # Prints p50/p95 deltas of every stage present in both runs
+    print(f"\n====== COMPARE {old['started_at']} -> {new['started_at']} ======")
+    rows = [("total", old["summary"]["total_ms"], new["summary"]["total_ms"])]
+    rows += [
+        (stage, old["summary"]["stages_ms"][stage], s)
+        for stage, s in new["summary"]["stages_ms"].items() if stage in old["summary"]["stages_ms"]
+    ]
+    for name, before, after in rows:
+        deltas = []
+        for key in ("p50", "p95"):
+            if before[key] and after[key] is not None:
+                deltas.append(f"{key} {before[key]} -> {after[key]} ms ({(after[key] - before[key]) / before[key]:+.0%})")
+        print(f"{name:<16}" + "   ".join(deltas))
+
+
+def parse_args(argv):
+    options = {"rounds": DEFAULT_ROUNDS, "cold": False, "latency_scale": None, "error_rate": None, "seed": None,
+               "output": None, "compare": None}
+    for arg in argv:
+        name, _, value = arg.lstrip("-").partition("=")
+        name = name.replace("-", "_")
+        if name == "cold":
+            options["cold"] = True
+        elif name in ("rounds", "seed"):
+            options[name] = int(value)
+        elif name in ("latency_scale", "error_rate"):
+            options[name] = float(value)
+        elif name in ("output", "compare"):
+            options[name] = value
+        else:
+            raise SystemExit(f"Unknown option {arg!r}")
+    return options
+
+
+def main(argv=None):
+    options = parse_args(sys.argv[1:] if argv is None else argv)
+    results = run_benchmark(
+        rounds=options["rounds"], cold=options["cold"], latency_scale=options["latency_scale"],
+        error_rate=options["error_rate"], seed=options["seed"],
+    )
+    print_summary(results)
+    path = save_results(results, options["output"])
+    print(f"[BENCH] Results saved to {path}")
+    if options["compare"]:
+        with open(options["compare"]) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+bulk loading into supabase. the movie cache is parsed on a thread pool, deduplicated by imdb_id (the
+title-named files in data/movie_cache repeat the tt*.json records), normalized once, and every table is
+upserted in batches; a failing batch is reported and skipped rather than aborting the load.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+VERBOSE = True
+
+DEFAULT_BATCH_SIZE = 500
+PARSE_WORKERS = 8
+MISSING = (None, "", "N/A", [], {})
+
+
+def _read_record(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except Exception as e:
+        if VERBOSE:
+            print(f"[SKIP] Failed to load {os.path.basename(path)}: {e}")
+        return None
+    if not isinstance(record, dict):
+        return None
+    return record, os.path.getmtime(path)
+
+
+def load_cache_records(cache_dir, workers=PARSE_WORKERS):
+    # [(record, mtime)] for every readable .json file in the cache
+    paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".json")]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [loaded for loaded in pool.map(_read_record, paths) if loaded]
+
+
+def completeness(record):
+    return sum(1 for value in record.values() if value not in MISSING)
+
+
+def dedupe_records(loaded):
+    # One record per imdb_id: the most complete one, newest file on a tie
+    best = {}
+    for record, mtime in loaded:
+        imdb_id = record.get("imdb_id") or ""
+        if not imdb_id.startswith("tt"):
+            continue
+        rank = (completeness(record), mtime)
+        if imdb_id not in best or rank > best[imdb_id][0]:
+            best[imdb_id] = (rank, record)
+    return [record for _, record in best.values()]
+
+
+def clean_percent(val):
+    if isinstance(val, (int, float)):
+        return int(val)
+    if isinstance(val, str) and val.endswith("%"):
+        return int(val.replace("%", ""))
+    return None
+
+
+def clean_float(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def clean_int(val):
+    if isinstance(val, int):
+        return val
+    if isinstance(val, str) and val.isdigit():
+        return int(val)
+    return None
+
+
+def normalize_movie(movie_data, updated_at=None):
+    # Cache record -> movies row
+    return {
+        "imdb_id": movie_data.get("imdb_id"),
+        "tmdb_id": movie_data.get("tmdb_id"),
+        "title": movie_data.get("title"),
+        "year": movie_data.get("year"),
+        "genres": movie_data.get("genres"),
+        "runtime": movie_data.get("runtime"),
+        "director": movie_data.get("director"),
+        "main_cast": movie_data.get("cast"),
+        "plot": movie_data.get("plot"),
+        "streaming_services": movie_data.get("streaming_services"),
+        "imdb_rating": clean_float(movie_data.get("imdb_rating")),
+        "metascore": clean_int(movie_data.get("metascore")),
+        "rotten_tomatoes": clean_percent(movie_data.get("rotten_tomatoes")),
+        "updated_at": updated_at or datetime.utcnow().isoformat(),
+    }
+
+
+def bulk_upsert(supabase, table, rows, batch_size=DEFAULT_BATCH_SIZE, on_conflict=None):
+    # Returns {"rows", "batches", "failed_batches", "failed_rows", "seconds"}
+    start = time.perf_counter()
+    stats = {"rows": 0, "batches": 0, "failed_batches": 0, "failed_rows": 0}
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        stats["batches"] += 1
+        try:
+            query = supabase.table(table).upsert(batch, on_conflict=on_conflict) if on_conflict else supabase.table(table).upsert(batch)
+            query.execute()
+            stats["rows"] += len(batch)
+        except Exception as e:
+            stats["failed_batches"] += 1
+            stats["failed_rows"] += len(batch)
+            print(f"[ERROR] {table} batch {stats['batches']} (rows {i}-{i + len(batch) - 1}): {e}")
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    if VERBOSE:
+        print(
+            f"[BULK] {table}: {stats['rows']} rows in {stats['batches']} batches "
+            f"({stats['failed_batches']} failed) in {stats['seconds']}s"
+        )
+    return stats
@@ -0,0 +1,103 @@
+"""
+renders IG cards from ig_card_template.html with one headless Chromium and a pool of pages.
+each page loads the template once and is reused: a render only swaps the text and poster src,
+waits for the poster to decode and takes the screenshot, so a batch costs about as much as one card.
+"""
+import asyncio
+import os
+import time
+
+from playwright.async_api import async_playwright
+
+VERBOSE = True
+
+TEMPLATE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "templates", "ig_card_template.html"))
+VIEWPORT = {"width": 768, "height": 1152}
+DEFAULT_PAGES = 4
+POSTER_LOAD_TIMEOUT_MS = 10000
+
+# Fills the template and resolves once the new poster has loaded and decoded (rejects if it can't)
+FILL_CARD_JS = """
+async ({title, imdb, rt, poster}) => {
+    document.getElementById("title").textContent = title;
+    document.getElementById("imdb-score").textContent = imdb;
+    document.getElementById("rt-score").textContent = rt;
+    const img = document.getElementById("poster");
+    img.src = poster;
+    await img.decode();
+    await document.fonts.ready;
+}
+"""
+
+
+class BrowserCardRenderer:
+    # async with BrowserCardRenderer(pages=4) as renderer: await renderer.render_many(cards)
+    def __init__(self, pages=DEFAULT_PAGES):
+        self.page_count = pages
+        self._playwright = None
+        self._browser = None
+        self._pages = None
+
+    async def __aenter__(self):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch()
+        self._pages = asyncio.Queue()
+        pages = await asyncio.gather(*(self._new_page() for _ in range(self.page_count)))
+        for page in pages:
+            self._pages.put_nowait(page)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._browser.close()
+        await self._playwright.stop()
+
+    async def _new_page(self):
+        page = await self._browser.new_page(viewport=VIEWPORT)
+        await page.goto(f"file://{TEMPLATE_PATH}")
+        return page
+
+    async def render(self, card):
+        # card: title, year, imdb_rating, rt_score, poster_path, output_path
+        page = await self._pages.get()
+        try:
+            if page is None:
+                page = await self._new_page()
+            await asyncio.wait_for(page.evaluate(FILL_CARD_JS, {
+                "title": f"{card['title']} ({card['year']})",
+                "imdb": str(card["imdb_rating"]),
+                "rt": card["rt_score"],
+                "poster": f"file://{os.path.abspath(card['poster_path'])}",
+            }), POSTER_LOAD_TIMEOUT_MS / 1000)
+            os.makedirs(os.path.dirname(card["output_path"]) or ".", exist_ok=True)
+            await page.screenshot(path=card["output_path"])
+        except BaseException:
+            # The page may still be busy with this render (wait_for only stops waiting), so it isn't reused:
+            # it's closed and its slot goes back empty, for the next render to open a fresh page in
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            self._pages.put_nowait(None)
+            raise
+        # Every field is overwritten on the next render, so the page goes straight back in the pool
+        self._pages.put_nowait(page)
+        return card["output_path"]
+
+    async def render_many(self, cards):
+        # Returns one entry per card: the output path, or the exception that card raised
+        return await asyncio.gather(*(self.render(card) for card in cards), return_exceptions=True)
+
+
+async def render_cards_async(cards, pages=DEFAULT_PAGES):
+    pages = max(1, min(pages, len(cards)))
+    start = time.perf_counter()
+    async with BrowserCardRenderer(pages=pages) as renderer:
+        results = await renderer.render_many(cards)
+    if VERBOSE:
+        print(f"[RENDER] {len(cards)} cards in {time.perf_counter() - start:.2f}s ({pages} pages)")
+    return results
+
+
+def render_cards(cards, pages=DEFAULT_PAGES):
+    return asyncio.run(render_cards_async(cards, pages))
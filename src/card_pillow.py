@@ -0,0 +1,189 @@
+"""
+browser-free IG card renderer. draws the same 768x1152 layout as ig_card_template.html with Pillow:
+decoded assets, fonts and the static background layer (colour, logo, headline, poster frame) are built
+once per process, so a card is one copy, one paste and three text draws. render_cards fans out over
+a process pool.
+"""
+import functools
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+VERBOSE = True
+
+TEMPLATES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "templates"))
+W, H = 768, 1152
+BG_COLOR = "#0F1C2E"
+HEADLINE = "Tonight's Pick"
+HEADLINE_COLOR = "#00C877"
+TEXT_COLOR = "#F2F4F5"
+LINE_HEIGHT = 1.15  # CSS line-height: normal for Arial
+PNG_COMPRESS_LEVEL = 1  # zlib level; 6 (the default) triples encode time for ~10% smaller files
+
+# Geometry straight from the template's CSS
+LOGO_WIDTH, LOGO_RIGHT, LOGO_TOP = 180, 20, 0
+HEADLINE_SIZE, HEADLINE_TOP = 64, 160
+POSTER_BOX = (134, 250, 500, 700)  # left, top, width, height of the content box
+POSTER_BORDER = 2
+TITLE_SIZE, TITLE_TOP = 40, 980
+RATING_SIZE, RATING_BOTTOM, ICON_HEIGHT, ICON_GAP, BLOCK_GAP = 32, 70, 40, 10, 40
+
+# Bold sans faces to try before falling back to Pillow's built-in font
+FONT_CANDIDATES = (
+    "Arial Bold.ttf",
+    "arialbd.ttf",
+    "/Library/Fonts/Arial Bold.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+    "/usr/share/fonts/truetype/msttcorefonts/Arial_Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "DejaVuSans-Bold.ttf",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size):
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+@functools.lru_cache(maxsize=None)
+def load_asset(name, width=None, height=None):
+    # Decoded once per process, already scaled to the size the template draws it at
+    path = os.path.join(TEMPLATES_DIR, name)
+    if not os.path.exists(path):
+        # The template asks for logo.png but the file on disk is logo.PNG
+        stem, ext = os.path.splitext(name)
+        path = os.path.join(TEMPLATES_DIR, stem + ext.upper())
+    img = Image.open(path).convert("RGBA")
+    if width:
+        img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+    elif height:
+        img = img.resize((round(img.width * height / img.height), height), Image.LANCZOS)
+    return img
+
+
+@functools.lru_cache(maxsize=4096)
+def text_width(text, size):
+    return get_font(size).getlength(text)
+
+
+def _line_offset(size):
+    # Distance from the top of a CSS line box to the text's ascender line
+    ascent, descent = get_font(size).getmetrics()
+    return (size * LINE_HEIGHT - (ascent + descent)) / 2
+
+
+def wrap_text(text, size, max_width):
+    words = text.split()
+    lines, line = [], ""
+    for word in words:
+        candidate = f"{line} {word}".strip()
+        if line and text_width(candidate, size) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+@functools.lru_cache(maxsize=1)
+def background_layer():
+    # Everything that doesn't change between cards
+    bg = Image.new("RGB", (W, H), BG_COLOR)
+    logo = load_asset("logo.png", width=LOGO_WIDTH)
+    bg.paste(logo, (W - LOGO_RIGHT - logo.width, LOGO_TOP), logo)
+
+    draw = ImageDraw.Draw(bg)
+    draw.text((W / 2, HEADLINE_TOP + _line_offset(HEADLINE_SIZE)), HEADLINE,
+              font=get_font(HEADLINE_SIZE), fill=HEADLINE_COLOR, anchor="ma")
+
+    left, top, width, height = POSTER_BOX
+    draw.rectangle(
+        (left, top, left + width + 2 * POSTER_BORDER - 1, top + height + 2 * POSTER_BORDER - 1),
+        fill="#000000",
+    )
+    return bg
+
+
+def _draw_title(draw, title):
+    font = get_font(TITLE_SIZE)
+    line_height = TITLE_SIZE * LINE_HEIGHT
+    y = TITLE_TOP + _line_offset(TITLE_SIZE)
+    for line in wrap_text(title, TITLE_SIZE, W):
+        draw.text((W / 2, y), line, font=font, fill=TEXT_COLOR, anchor="ma")
+        y += line_height
+
+
+def _draw_ratings(card_img, draw, rt_score, imdb_rating):
+    # Two icon + score blocks, centred as a flex row sitting RATING_BOTTOM px above the bottom edge
+    font = get_font(RATING_SIZE)
+    blocks = [(load_asset("rt.png", height=ICON_HEIGHT), rt_score), (load_asset("imdb.png", height=ICON_HEIGHT), imdb_rating)]
+    widths = [icon.width + ICON_GAP + text_width(text, RATING_SIZE) for icon, text in blocks]
+    row_height = max(ICON_HEIGHT, RATING_SIZE * LINE_HEIGHT)
+    middle = H - RATING_BOTTOM - row_height / 2
+    x = (W - sum(widths) - BLOCK_GAP * (len(blocks) - 1)) / 2
+    for (icon, text), width in zip(blocks, widths):
+        card_img.paste(icon, (round(x), round(middle - icon.height / 2)), icon)
+        draw.text((x + icon.width + ICON_GAP, middle), text, font=font, fill=TEXT_COLOR, anchor="lm")
+        x += width + BLOCK_GAP
+
+
+def render_card(card):
+    # card: title, year, imdb_rating, rt_score, poster_path, output_path. Safe to run in worker processes.
+    img = background_layer().copy()
+    left, top, width, height = POSTER_BOX
+    with Image.open(card["poster_path"]) as poster:
+        poster = poster.convert("RGB")
+        if poster.size != (width, height):
+            # Not a card derivative; crop like object-fit: cover
+            poster = ImageOps.fit(poster, (width, height), Image.LANCZOS)
+        img.paste(poster, (left + POSTER_BORDER, top + POSTER_BORDER))
+
+    draw = ImageDraw.Draw(img)
+    _draw_title(draw, f"{card['title']} ({card['year']})")
+    _draw_ratings(img, draw, card["rt_score"], str(card["imdb_rating"]))
+
+    output_path = card["output_path"]
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    # A private temp file: another worker may be rendering a card with the same slug right now
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(output_path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, "PNG", compress_level=PNG_COMPRESS_LEVEL)
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return output_path
+
+
+def _render_or_error(card):
+    try:
+        return render_card(card)
+    except Exception as e:
+        return e
+
+
+def render_cards(cards, workers=None):
+    # Same contract as card_browser.render_cards: one output path or exception per card.
+    # workers=1 renders in this process, which is faster than a pool for a handful of cards.
+    start = time.perf_counter()
+    if workers == 1 or len(cards) <= 1:
+        results = [_render_or_error(card) for card in cards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_or_error, cards))
+    if VERBOSE:
+        print(f"[RENDER] {len(cards)} cards in {time.perf_counter() - start:.2f}s (pillow)")
+    return results
@@ -5,96 +5,116 @@ from dotenv import load_dotenv
 import os
 import sys
 from supabase import create_client
-import requests
-import asyncio
-from playwright.async_api import async_playwright
 from slugify import slugify
-from PIL import Image
-from io import BytesIO
 from pathlib import Path
+from random import sample
+from poster_derivatives import get_derivative
+from poster_store import poster_key
 
 load_dotenv("../.env.local")
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 OUTPUT_DIR = "data/output"
-POSTER_TEMP_PATH = "poster.jpg"
-Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
-
-
-# Optionally filter by genre if provided on command line
-genre_filter = sys.argv[1].lower() if len(sys.argv) > 1 else None
-
-# Query 5 high-rated movies with both RT and IMDb scores (optionally by genre)
-query = (
-    supabase.table("movies")
-    .select("*")
-    .filter("imdb_rating", "not.is", "null")
-    .filter("rotten_tomatoes", "not.is", "null")
-)
-
-if genre_filter:
-    query = query.contains("genres", [genre_filter.capitalize()])
-    print(f"[→] Filtering by genre: {genre_filter}")
-
-
-from random import sample
-
-# Fetch a larger pool of high-rated movies
-response = query.order("imdb_rating", desc=True).limit(50).execute()
-movies = response.data
-
-# Randomly select 5 from that pool
-movies = sample(movies, k=5)
-
-for movie in movies:
-    title = movie["title"]
-    year = movie["year"]
-    imdb_score = str(movie["imdb_rating"])
-    rt_score = f"{movie['rotten_tomatoes']}%"
-    poster_url = movie["poster_url"]
-
-    # Download the poster
-    try:
-        r = requests.get(poster_url)
-        r.raise_for_status()
-        img = Image.open(BytesIO(r.content)).convert("RGB")
-        img.save(POSTER_TEMP_PATH)
-    except Exception as e:
-        print(f"❌ Failed to download poster for {title}: {e}")
-        continue
-
-    safe_title = slugify(title)
-    output_path = os.path.join(OUTPUT_DIR, f"{safe_title}.png")
-
-    async def render_template_to_image(output_path, title, year, imdb_rating, rt_score, poster_path):
-        template_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/templates/ig_card_template.html"))
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page(viewport={"width": 768, "height": 1152})
-            await page.goto(f"file://{template_path}")
-            await page.evaluate(f'''
-                () => {{
-                    document.getElementById("title").textContent = "{title} ({year})";
-                    document.getElementById("imdb-score").textContent = "{imdb_rating}";
-                    document.getElementById("rt-score").textContent = "{rt_score}";
-                    document.getElementById("poster").src = "file://{os.path.abspath(poster_path)}";
-                }}
-            ''')
-            await page.wait_for_timeout(1000)  # wait for images to load
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            await page.screenshot(path=output_path)
-            await browser.close()
-
-    asyncio.run(render_template_to_image(
-        output_path=output_path,
-        title=title,
-        year=year,
-        imdb_rating=imdb_score,
-        rt_score=rt_score,
-        poster_path=POSTER_TEMP_PATH
-    ))
-
-    print(f"[✓] Saved IG post for: {title} -> {output_path}")
\ No newline at end of file
+RENDERERS = ("browser", "pillow")
+RENDER_PAGES = 5  # browser pages rendering in parallel
+RENDER_WORKERS = None  # pillow worker processes (None = one per core)
+
+_supabase = None
+
+
+def get_supabase():
+    # Created on first use, so importing this module (e.g. from reel_maker) doesn't open a client
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+
+def parse_args(argv):
+    # Usage: python create_ig_posts.py [genre] [--renderer=browser|pillow]
+    renderer = "browser"
+    args = []
+    for arg in argv:
+        if arg.startswith("--renderer="):
+            renderer = arg.split("=", 1)[1]
+        else:
+            args.append(arg)
+    if renderer not in RENDERERS:
+        sys.exit(f"Unknown renderer {renderer!r}; choose from {', '.join(RENDERERS)}")
+    # Optionally filter by genre if provided on command line
+    genre_filter = args[0].lower() if args else None
+    return genre_filter, renderer
+
+
+def select_movies(genre_filter=None, k=5):
+    # Query high-rated movies with both RT and IMDb scores (optionally by genre)
+    query = (
+        get_supabase().table("movies")
+        .select("*")
+        .filter("imdb_rating", "not.is", "null")
+        .filter("rotten_tomatoes", "not.is", "null")
+    )
+
+    if genre_filter:
+        query = query.contains("genres", [genre_filter.capitalize()])
+        print(f"[→] Filtering by genre: {genre_filter}")
+
+    # Fetch a larger pool of high-rated movies and randomly select k from it
+    response = query.order("imdb_rating", desc=True).limit(50).execute()
+    movies = response.data
+    return sample(movies, k=min(k, len(movies)))
+
+
+def build_cards(movies):
+    cards = []
+    for movie in movies:
+        title = movie["title"]
+        poster_url = movie["poster_url"]
+
+        # Card-sized poster from the store, cropped and encoded once (the template shows it as-is)
+        try:
+            poster_path = get_derivative(poster_key(movie), "card", poster_url)
+            if not poster_path:
+                raise FileNotFoundError("poster not available")
+        except Exception as e:
+            print(f"❌ Failed to download poster for {title}: {e}")
+            continue
+
+        cards.append({
+            "title": title,
+            "year": movie["year"],
+            "imdb_rating": str(movie["imdb_rating"]),
+            "rt_score": f"{movie['rotten_tomatoes']}%",
+            "poster_path": poster_path,
+            "output_path": os.path.join(OUTPUT_DIR, f"{slugify(title)}.png"),
+        })
+    return cards
+
+
+def render(cards, renderer="browser"):
+    if not cards:
+        return []
+    if renderer == "pillow":
+        # Pure Pillow, no browser: milliseconds per card, spread over worker processes
+        from card_pillow import render_cards
+        return render_cards(cards, workers=RENDER_WORKERS)
+    # One browser, one page per card: the whole batch renders concurrently
+    from card_browser import render_cards
+    return render_cards(cards, pages=RENDER_PAGES)
+
+
+def main():
+    genre_filter, renderer = parse_args(sys.argv[1:])
+    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+    cards = build_cards(select_movies(genre_filter))
+    for card, result in zip(cards, render(cards, renderer)):
+        if isinstance(result, Exception):
+            print(f"❌ Failed to render IG post for {card['title']}: {result}")
+        else:
+            print(f"[✓] Saved IG post for: {card['title']} -> {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+request-scoped deadline. one Deadline is created per recommendation and made current with use_deadline();
+the HTTP layer and retry policy read it to cap timeouts and sleeps, and pipeline stages ask should() before
+doing optional work. degradations kick in as the remaining budget shrinks, always in DEGRADATION_ORDER.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+VERBOSE = True
+
+DEFAULT_DEADLINE_SECONDS = 8.0
+
+# (name, fraction of the budget left below which it applies) — each level implies the ones before it
+DEGRADATION_ORDER = (
+    ("skip_omdb", 0.6),          # no OMDb ratings for newly enriched movies
+    ("stale_providers", 0.5),    # provider availability from cache only, however old
+    ("cut_candidates", 0.4),     # stop pulling candidates and rank what we have
+    ("local_answer", 0.25),      # skip the final GPT call and answer from the local ranking
+)
+_LEVELS = {name: i for i, (name, _) in enumerate(DEGRADATION_ORDER)}
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    def __init__(self, budget_seconds=DEFAULT_DEADLINE_SECONDS):
+        self.budget = budget_seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_seconds
+        self.degradations = []
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def time_until(self, name):
+        # Seconds left before the named degradation applies
+        fraction = DEGRADATION_ORDER[_LEVELS[name]][1]
+        return max(0.0, self.remaining() - fraction * self.budget)
+
+    def should(self, name):
+        if name in self.degradations:
+            return True
+        if self.time_until(name) > 0:
+            return False
+        self.apply(name)
+        return True
+
+    def apply(self, name, cascade=True):
+        # cascade=False records a degradation forced by an error rather than by running out of time
+        levels = DEGRADATION_ORDER[:_LEVELS[name] + 1] if cascade else [DEGRADATION_ORDER[_LEVELS[name]]]
+        with self._lock:
+            for level_name, _ in levels:
+                if level_name not in self.degradations:
+                    self.degradations.append(level_name)
+                    if VERBOSE:
+                        print(f"[DEADLINE] {self.remaining():.2f}s left of {self.budget}s — degrading: {level_name}")
+
+    def cap_timeout(self, timeout):
+        # Shrinks a requests-style timeout (number or (connect, read)) to fit the time left
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline of {self.budget}s exceeded")
+        if isinstance(timeout, tuple):
+            return tuple(min(t, remaining) for t in timeout)
+        return min(timeout, remaining) if timeout is not None else remaining
+
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def use_deadline(deadline):
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
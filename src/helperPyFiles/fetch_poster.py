@@ -1,11 +1,23 @@
 """
-gets movies from supabase that don't have a movie url and tries to get it
+gets movies from supabase that don't have a poster url and tries to get it.
+runs on the backfill runner: resumable, concurrent (within TMDb's rate limit) and written back in bulk.
+
+    python fetch_poster.py            # resume (or start) the backfill
+    python fetch_poster.py --restart  # ignore the checkpoint and start from the first movie
 """
 import os
-import requests
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from supabase import create_client
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backfill import SKIP, run_backfill, supabase_source
+from http_client import http_get
+from poster_store import prefetch
+from retry_policy import with_retries
+
 # Load env vars
 load_dotenv("../.env.local")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -14,47 +26,61 @@ TMDB_BEARER_TOKEN = os.getenv("TMDB_BEARER_TOKEN")
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-# Create posters dir
-poster_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "posters"))
-os.makedirs(poster_dir, exist_ok=True)
-
-# Pull all movies from Supabase where poster_url is null
-res = (
-    supabase.table("movies")
-    .select("imdb_id, tmdb_id, title, poster_url")
-    .filter("poster_url", "is", "null")
-    .limit(1000)
-    .execute()
-)
-movies = res.data
-
-for movie in movies:
-    movie_id = movie["imdb_id"]
-    tmdb_id = movie["tmdb_id"]
+WORKERS = 8
+PAGE_SIZE = 200
+SAVE_WORKERS = 8
+
 
-    # Get poster from TMDb
+@with_retries()
+def fetch_tmdb_movie(tmdb_id):
     headers = {"Authorization": f"Bearer {TMDB_BEARER_TOKEN}", "accept": "application/json"}
-    r = requests.get(f"https://api.themoviedb.org/3/movie/{tmdb_id}", headers=headers)
+    return http_get("tmdb", f"https://api.themoviedb.org/3/movie/{tmdb_id}", headers=headers).json()
 
-    if r.status_code != 200:
-        print(f"[✗] Failed to fetch TMDb data for {tmdb_id}")
-        continue
 
-    poster_path = r.json().get("poster_path")
+def find_poster(movie):
+    tmdb_id = movie["tmdb_id"]
+    if not tmdb_id:
+        return SKIP
+
+    poster_path = fetch_tmdb_movie(tmdb_id).get("poster_path")
     if not poster_path:
         print(f"[!] No poster found for TMDb ID {tmdb_id}")
-        continue
+        return SKIP
 
     poster_url = f"https://image.tmdb.org/t/p/w500{poster_path}"
     print(f"[✓] {tmdb_id} → {poster_url}")
 
-    # Download and save poster
-    img_data = requests.get(poster_url).content
-    filename = os.path.join(poster_dir, f"{tmdb_id}.jpg")
-    with open(filename, "wb") as f:
-        f.write(img_data)
+    # Download into the shared poster store in the background (skipped if we already have it)
+    prefetch(tmdb_id, poster_url)
+    return {"imdb_id": movie["imdb_id"], "tmdb_id": tmdb_id, "title": movie["title"], "poster_url": poster_url}
+
+
+def save_posters(rows):
+    # Written back a page at a time, SAVE_WORKERS updates in flight. update() only touches rows that exist (an
+    # upsert of these partial rows could insert half-empty movies), and bumping updated_at lets the movie_store
+    # replica sync pick up the new poster URLs. An error fails the page, so it isn't checkpointed.
+    updated_at = datetime.utcnow().isoformat()
+
+    def save(row):
+        supabase.table("movies").update(
+            {"poster_url": row["poster_url"], "updated_at": updated_at}
+        ).eq("imdb_id", row["imdb_id"]).execute()
+
+    with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as pool:
+        list(pool.map(save, rows))
+
+
+def main():
+    # All movies where poster_url is null, walked in imdb_id order
+    source = supabase_source(
+        supabase, "movies", "imdb_id, tmdb_id, title, poster_url", key="imdb_id",
+        apply_filters=lambda query: query.filter("poster_url", "is", "null"),
+    )
+    run_backfill(
+        "fetch_poster", source, key_fn=lambda movie: movie["imdb_id"], process=find_poster, flush=save_posters,
+        workers=WORKERS, page_size=PAGE_SIZE, restart="--restart" in sys.argv,
+    )
+
 
-    # Update poster_url in Supabase
-    supabase.table("movies").update({
-        "poster_url": poster_url
-    }).eq("imdb_id", movie_id).execute()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 import json
 import os
+import sys
 from supabase import create_client, Client
 from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from bulk_loader import bulk_upsert
+
 load_dotenv("../.env.local")
 
 # Supabase config from environment
@@ -13,37 +18,56 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 api_log_path = "../data/api_usage_log.json"
 keywords_path = "../data/tmdb_keywords.json"
 genres_path = "../data/tmdb_genres.json"
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        print(f"[SKIP] {path} not found")
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
 # Push API usage log
-"""
-if os.path.exists(api_log_path):
-    with open(api_log_path, "r") as f:
-        api_log = json.load(f)
-    for date_str, counts in api_log.items():
-        supabase.table("api_usage_log").upsert({
-            "date": date_str,
-            "tmdb_count": counts.get("tmdb", 0),
-            "omdb_count": counts.get("omdb", 0)
-        }).execute()
+def push_api_log():
+    api_log = load_json(api_log_path)
+    if api_log is None:
+        return
+    rows = [
+        {"date": date_str, "tmdb_count": counts.get("tmdb", 0), "omdb_count": counts.get("omdb", 0)}
+        for date_str, counts in api_log.items()
+    ]
+    bulk_upsert(supabase, "api_usage_log", rows)
     print("[✓] api_usage_log.json pushed")
 
+
 # Push keywords
-if os.path.exists(keywords_path):
-    with open(keywords_path, "r") as f:
-        keywords = json.load(f)
-    for name, kid in keywords.items():
-        supabase.table("tmdb_keywords").upsert({
-            "keyword_name": name,
-            "keyword_id": kid
-        }).execute()
+def push_keywords():
+    keywords = load_json(keywords_path)
+    if keywords is None:
+        return
+    rows = [{"keyword_name": name, "keyword_id": kid} for name, kid in keywords.items()]
+    bulk_upsert(supabase, "tmdb_keywords", rows)
     print("[✓] tmdb_keywords.json pushed")
-"""
+
+
 # Push genres
-if os.path.exists(genres_path):
-    with open(genres_path, "r") as f:
-        genres = json.load(f)
-    for genre_id, genre_name in genres.items():
-        supabase.table("tmdb_genres").upsert({
-            "genre_id": int(genre_id),
-            "genre_name": genre_name
-        }).execute()
-    print("[✓] tmdb_genres.json pushed")
\ No newline at end of file
+def push_genres():
+    genres = load_json(genres_path)
+    if genres is None:
+        return
+    rows = [{"genre_id": int(genre_id), "genre_name": genre_name} for genre_id, genre_name in genres.items()]
+    bulk_upsert(supabase, "tmdb_genres", rows)
+    print("[✓] tmdb_genres.json pushed")
+
+
+# Conflicts resolve on each table's primary key, like the per-row upserts these replaced; none of these tables
+# declares a unique constraint on keyword_name or date
+TABLES = {"api_log": push_api_log, "keywords": push_keywords, "genres": push_genres}
+
+if __name__ == "__main__":
+    # Usage: python migrate_json_to_supabase.py [api_log] [keywords] [genres]  (default: genres)
+    for name in sys.argv[1:] or ["genres"]:
+        if name not in TABLES:
+            sys.exit(f"Unknown table {name!r}; choose from {', '.join(TABLES)}")
+        TABLES[name]()
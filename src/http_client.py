@@ -0,0 +1,310 @@
+"""
+shared HTTP layer for upstream APIs (TMDb, OMDb).
+each upstream gets a pooled session, an optional token-bucket rate limit shared by everything in the
+process (request path and backfills alike), a circuit breaker that fails fast once its error rate crosses a
+threshold (recovering through half-open probes), and optional hedging: if a GET hasn't answered by the
+upstream's recent p95 latency, a duplicate is sent and whichever answers first wins.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from deadline import DeadlineExceeded, current_deadline
+from retry_policy import is_retryable
+from metrics import UPSTREAM_LATENCY, UPSTREAM_REQUESTS, endpoint_of, status_of
+from tracing import span
+
+VERBOSE = True
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+
+
+class UpstreamConfig:
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, hedge=False, rate_limit=None, burst=None,
+                 failure_threshold=0.5, min_calls=10, window_seconds=30, open_seconds=20, half_open_probes=2):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.rate_limit = rate_limit  # requests per second, None for unlimited
+        self.burst = burst or rate_limit
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+
+# OMDb has a daily quota, so duplicate requests are only sent to TMDb.
+# TMDb allows roughly 50 requests/s per IP; staying under it keeps backfills from tripping 429s.
+UPSTREAMS = {
+    "tmdb": UpstreamConfig("tmdb", hedge=True, rate_limit=40, burst=20),
+    "omdb": UpstreamConfig("omdb", hedge=False),
+}
+
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+HEDGE_PERCENTILE = 0.95
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, config):
+        self.config = config
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._outcomes = deque()  # (timestamp, ok)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.config.window_seconds:
+            self._outcomes.popleft()
+
+    def allow(self):
+        now = time.time()
+        with self._lock:
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.config.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.config.name} circuit is open")
+                self.state = self.HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+                if VERBOSE:
+                    print(f"[CIRCUIT] {self.config.name} half-open — probing upstream.")
+            if self.state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.config.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.config.name} circuit is half-open and probes are in flight")
+                self._probes_in_flight += 1
+
+    def record(self, ok):
+        now = time.time()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not ok:
+                    self._open(now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.config.half_open_probes:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    if VERBOSE:
+                        print(f"[CIRCUIT] {self.config.name} closed — upstream recovered.")
+                return
+            self._outcomes.append((now, ok))
+            self._trim(now)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if (
+                self.state == self.CLOSED
+                and len(self._outcomes) >= self.config.min_calls
+                and failures / len(self._outcomes) >= self.config.failure_threshold
+            ):
+                self._open(now)
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self.opened_at = now
+        if VERBOSE:
+            print(f"[CIRCUIT] {self.config.name} opened — failing fast for {self.config.open_seconds}s.")
+
+
+class RateLimiter:
+    # Token bucket: `rate` tokens per second, holding at most `burst`
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # Takes a token (possibly going into debt) and returns how long to wait before using it
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait_seconds = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait_seconds
+            return wait_seconds
+
+    def acquire(self, timeout=None):
+        # Blocks until a token is available; returns False (without taking one) if that's longer than timeout
+        wait_seconds = self._reserve()
+        if timeout is not None and wait_seconds > timeout:
+            with self._lock:
+                self.tokens += 1
+                self.waited -= wait_seconds
+            return False
+        if wait_seconds:
+            time.sleep(wait_seconds)
+        return True
+
+
+class LatencyTracker:
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class Upstream:
+    def __init__(self, config):
+        self.config = config
+        self.breaker = CircuitBreaker(config)
+        self.latency = LatencyTracker()
+        self.limiter = RateLimiter(config.rate_limit, config.burst) if config.rate_limit else None
+        if _session_factory:
+            self.session = _session_factory(config.name)
+        else:
+            import requests  # deferred: only processes that actually call upstreams pay for the import
+            self.session = requests.Session()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._hedge_lock = threading.Lock()  # hedged requests for one upstream run on several pool threads
+
+    def count_hedge(self, won=False):
+        with self._hedge_lock:
+            if won:
+                self.hedges_won += 1
+            else:
+                self.hedges_sent += 1
+
+    def hedge_delay(self):
+        if not self.config.hedge or len(self.latency) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, self.latency.percentile(HEDGE_PERCENTILE))
+
+    def stats(self):
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        with self._hedge_lock:
+            hedges_sent, hedges_won = self.hedges_sent, self.hedges_won
+        return {
+            "circuit": self.breaker.state,
+            "rejected": self.breaker.rejected,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedges_sent": hedges_sent,
+            "hedges_won": hedges_won,
+            "rate_limit_wait_s": round(self.limiter.waited, 3) if self.limiter else None,
+        }
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+_session_factory = None
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="http-hedge")
+
+
+def set_session_factory(factory):
+    # factory(service) -> object with requests.Session's get(); None restores real sessions (used by standins)
+    global _session_factory
+    with _upstreams_lock:
+        _session_factory = factory
+        _upstreams.clear()
+
+
+def get_upstream(service):
+    with _upstreams_lock:
+        if service not in _upstreams:
+            _upstreams[service] = Upstream(UPSTREAMS.get(service) or UpstreamConfig(service))
+        return _upstreams[service]
+
+
+def _timed_get(upstream, url, kwargs, on_request):
+    if on_request:
+        on_request()
+    service, endpoint = upstream.config.name, endpoint_of(url)
+    start = time.perf_counter()
+    try:
+        r = upstream.session.get(url, **kwargs)
+    except Exception as e:
+        UPSTREAM_REQUESTS.inc(service=service, endpoint=endpoint, status=status_of(e))
+        raise
+    elapsed = time.perf_counter() - start
+    upstream.latency.add(elapsed)
+    UPSTREAM_REQUESTS.inc(service=service, endpoint=endpoint, status=r.status_code)
+    UPSTREAM_LATENCY.observe(elapsed, service=service, endpoint=endpoint)
+    return r
+
+
+def _hedged_get(upstream, url, kwargs, delay, on_request):
+    primary = _hedge_pool.submit(_timed_get, upstream, url, kwargs, on_request)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    if upstream.limiter and not upstream.limiter.acquire(timeout=0):
+        # Only hedge with spare rate-limit capacity
+        return primary.result()
+    upstream.count_hedge()
+    hedge = _hedge_pool.submit(_timed_get, upstream, url, kwargs, on_request)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    upstream.count_hedge(won=True)
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+def http_get(service, url, on_request=None, **kwargs):
+    # on_request is called once per request actually sent (hedges included), e.g. for quota accounting
+    upstream = get_upstream(service)
+    kwargs.setdefault("timeout", upstream.config.timeout)
+    deadline = current_deadline()
+    if deadline:
+        kwargs["timeout"] = deadline.cap_timeout(kwargs["timeout"])
+    if upstream.limiter and not upstream.limiter.acquire(timeout=deadline.remaining() if deadline else None):
+        raise DeadlineExceeded(f"{service} rate limit wait would outlast the deadline")
+    upstream.breaker.allow()
+    with span(f"http.{service}", path=urlparse(url).path) as s:
+        try:
+            delay = upstream.hedge_delay()
+            if delay is None:
+                r = _timed_get(upstream, url, kwargs, on_request)
+            else:
+                s.set(hedge_delay_ms=round(delay * 1000, 1))
+                r = _hedged_get(upstream, url, kwargs, delay, on_request)
+            s.set(status=r.status_code)
+            r.raise_for_status()
+        except Exception as e:
+            # Only upstream trouble counts against the breaker; a 404 is a healthy answer
+            upstream.breaker.record(not is_retryable(e))
+            raise
+    upstream.breaker.record(True)
+    return r
+
+
+def http_stats():
+    with _upstreams_lock:
+        return {name: upstream.stats() for name, upstream in _upstreams.items()}
@@ -0,0 +1,290 @@
+"""
+process-wide counters and histograms in the Prometheus text format. instrumented code updates them directly
+(http_client per upstream request, chat_completion per GPT call, the caches on every lookup, supabase queries
+through instrument_supabase()); a long-running process serves them on /metrics with start_http_server(), and
+one-off scripts can be run under the CLI to get a dump when they finish:
+
+    MOVIEMATCH_METRICS_PORT=9108   # any process serving recommendations exposes http://localhost:9108/metrics
+    python metrics.py helperPyFiles/fetch_poster.py --restart   # run a script, then print its metrics
+"""
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+
+VERBOSE = True
+
+PREFIX = "moviematch_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += [line for key, value in items for line in self._render_one(key, value)]
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def total(self, **labels):
+        # Sum over every label set matching the given labels
+        wanted = [(self.label_names.index(n), str(v)) for n, v in labels.items()]
+        with self._lock:
+            return sum(
+                count for key, count in self._values.items() if all(key[i] == value for i, value in wanted))
+
+    def _render_one(self, key, value):
+        yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])  # per-bucket counts, sum, count
+            i = bisect.bisect_left(self.buckets, amount)
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += amount
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _render_one(self, key, value):
+        counts, total, observations = value
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            yield f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', _format_value(bound))])} {cumulative}"
+        yield f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', '+Inf')])} {observations}"
+        yield f"{self.name}_sum{_format_labels(self.label_names, key)} {round(total, 6)}"
+        yield f"{self.name}_count{_format_labels(self.label_names, key)} {observations}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+UPSTREAM_REQUESTS = registry.counter(
+    "upstream_requests_total", "HTTP requests sent to upstream APIs (hedges included)", ("service", "endpoint", "status"))
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_request_seconds", "Upstream HTTP request latency", ("service", "endpoint"))
+GPT_REQUESTS = registry.counter("gpt_requests_total", "OpenAI chat completions by call site", ("call_site", "status"))
+GPT_LATENCY = registry.histogram("gpt_request_seconds", "OpenAI chat completion latency", ("call_site",))
+GPT_TOKENS = registry.counter("gpt_tokens_total", "OpenAI tokens used", ("call_site", "kind"))
+CACHE_LOOKUPS = registry.counter("cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+SUPABASE_LATENCY = registry.histogram(
+    "supabase_query_seconds", "Supabase query latency", ("table", "operation", "status"))
+RECOMMENDATION_LATENCY = registry.histogram(
+    "recommendation_seconds", "End-to-end recommend_movies_from_prompt latency", ("outcome",))
+DEGRADATIONS = registry.counter("degradations_total", "Deadline degradations applied", ("degradation",))
+COALESCED_CALLS = registry.counter(
+    "singleflight_coalesced_total", "Calls that waited for an identical in-flight fetch instead of making their own",
+    ("operation",))
+RETRIES = registry.counter("retries_total", "Upstream call attempts that failed and were retried", ("operation",))
+RETRY_WAIT = registry.counter(
+    "retry_wait_seconds_total", "Backoff time spent sleeping before retries", ("operation",))
+RETRY_GIVE_UPS = registry.counter(
+    "retry_give_ups_total", "Calls that failed for good (not retryable, out of attempts or out of time)",
+    ("operation",))
+
+
+def endpoint_of(url):
+    # /3/movie/603/watch/providers -> /3/movie/{id}/watch/providers, so ids don't explode the label space
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?")[0] or "/"
+    return re.sub(r"(?<=.)/\d+(?=/|$)", "/{id}", path)  # the leading /3 is TMDb's API version, not an id
+
+
+def status_of(exc):
+    response = getattr(exc, "response", None)
+    if response is not None and getattr(response, "status_code", None):
+        return str(response.status_code)
+    return type(exc).__name__
+
+
+######### supabase #########
+
+_SUPABASE_OPERATIONS = ("select", "insert", "upsert", "update", "delete")
+
+
+class _TimedQuery:
+    # Wraps a postgrest query builder; execute() is timed and labelled with table and operation
+    def __init__(self, query, table, operation=None):
+        self._query = query
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        operation = self._operation or (name if name in _SUPABASE_OPERATIONS else None)
+        if not callable(attr):
+            return _TimedQuery(attr, self._table, operation) if hasattr(attr, "execute") else attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _TimedQuery(result, self._table, operation) if hasattr(result, "execute") else result
+        return call
+
+    def execute(self):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return self._query.execute()
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            SUPABASE_LATENCY.observe(
+                time.perf_counter() - start, table=self._table, operation=self._operation or "select", status=status)
+
+
+class _TimedSupabase:
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _TimedQuery(self._client.table(name), name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_supabase(client):
+    return _TimedSupabase(client)
+
+
+######### exposition #########
+
+def _handler_class():
+    # http.server (and the http.client/email modules it drags in) is only imported by processes that serve metrics
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=None, host="0.0.0.0"):
+    # Serves /metrics from a daemon thread; a no-op without a port (argument or MOVIEMATCH_METRICS_PORT)
+    global _server
+    port = port or os.getenv("MOVIEMATCH_METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            from http.server import ThreadingHTTPServer
+            _server = ThreadingHTTPServer((host, int(port)), _handler_class())
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+            if VERBOSE:
+                print(f"[METRICS] Serving /metrics on port {port}")
+    return _server
+
+
+def dump(stream=None):
+    (stream or sys.stdout).write(registry.render())
+
+
+if __name__ == "__main__":
+    import runpy
+
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: python metrics.py <script.py> [args...]")
+    script = os.path.abspath(sys.argv[1])
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, os.path.dirname(script))
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        # The script's own imports loaded this file again as "metrics"; that copy holds its numbers
+        import metrics
+
+        print("\n====== METRICS ======")
+        metrics.dump()
@@ -0,0 +1,233 @@
+"""
+read-through cache for rows of the supabase `movies` table.
+tier 1 is an in-process LRU (cache.TTLCache), tier 2 a local SQLite replica kept current by pulling rows whose
+updated_at is past the last sync mark; supabase itself is only asked on a miss in both. writes through
+push_movie_to_supabase refresh both tiers with the written row. when supabase is unreachable, whatever the replica
+holds keeps being served.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cache import TTLCache
+from metrics import CACHE_LOOKUPS
+
+VERBOSE = True
+
+REPLICA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "movie_replica.sqlite3"))
+LOOKUP_COLUMNS = ("imdb_id", "tmdb_id")
+SYNC_PAGE_SIZE = 1000
+DEFAULT_SYNC_INTERVAL = 5 * 60
+
+
+class MovieStore:
+    def __init__(self, supabase, db_path=None, lru_size=2048, lru_ttl=10 * 60):
+        # supabase: a client, or a zero-argument function returning one (called on first remote access)
+        self._supabase = supabase
+        self.db_path = db_path or REPLICA_PATH
+        self.lru = TTLCache("movies", maxsize=lru_size, ttl=lru_ttl)
+        self.replica_hits = 0
+        self.remote_hits = 0
+        self.remote_misses = 0
+        self.remote_errors = 0
+        self.last_sync = None
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._syncer = None
+        self._stop = threading.Event()
+
+    @property
+    def supabase(self):
+        return self._supabase() if callable(self._supabase) else self._supabase
+
+    def _conn(self):
+        # Opened lazily so importing production_v1 doesn't touch the disk
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS movies ("
+                "imdb_id TEXT PRIMARY KEY, tmdb_id TEXT, updated_at TEXT, data TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS movies_tmdb_id ON movies (tmdb_id)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.commit()
+        return self._db
+
+    # --- reads ---
+
+    def get(self, column, value):
+        # Returns a copy of the row (callers overlay fields on it), or None
+        if column not in LOOKUP_COLUMNS:
+            raise ValueError(f"movies can only be looked up by {', '.join(LOOKUP_COLUMNS)}")
+        if value is None:
+            return None
+        key = (column, str(value))
+        row = self.lru.get(key)
+        if row is not None:
+            return dict(row)
+
+        row = self._replica_get(column, str(value))
+        if row is not None:
+            self.replica_hits += 1
+            CACHE_LOOKUPS.inc(cache="movie_replica", result="hit")
+        else:
+            CACHE_LOOKUPS.inc(cache="movie_replica", result="miss")
+            row = self._remote_get(column, value)
+            if row is None:
+                return None
+            self._replica_put([row])
+        self._remember(row)
+        return dict(row)
+
+    def _remember(self, row):
+        for column in LOOKUP_COLUMNS:
+            if row.get(column) is not None:
+                self.lru.set((column, str(row[column])), row)
+
+    def _replica_get(self, column, value):
+        with self._db_lock:
+            found = self._conn().execute(
+                f"SELECT data FROM movies WHERE {column} = ? ORDER BY updated_at DESC", (value,)).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def _remote_get(self, column, value):
+        try:
+            result = self.supabase.table("movies").select("*").eq(column, value).execute()
+        except Exception as e:
+            self.remote_errors += 1
+            if VERBOSE:
+                print(f"[ERROR] Supabase lookup of movie {column}={value} failed: {e}")
+            return None
+        if result and result.data:
+            self.remote_hits += 1
+            return result.data[0]
+        self.remote_misses += 1
+        return None
+
+    # --- writes ---
+
+    def _replica_put(self, rows):
+        rows = [r for r in rows if r.get("imdb_id")]
+        if not rows:
+            return
+        with self._db_lock:
+            db = self._conn()
+            db.executemany(
+                "INSERT OR REPLACE INTO movies (imdb_id, tmdb_id, updated_at, data) VALUES (?, ?, ?, ?)",
+                [
+                    (r["imdb_id"], str(r["tmdb_id"]) if r.get("tmdb_id") is not None else None,
+                     r.get("updated_at"), json.dumps(r))
+                    for r in rows
+                ],
+            )
+            db.commit()
+
+    def refresh(self, row):
+        # Called after every write to the movies table with the row as written. Both tiers are updated in place
+        # rather than dropped, so the movie is still served if supabase becomes unreachable right after the write.
+        # Columns the write didn't send are kept from the replica's copy.
+        imdb_id = row.get("imdb_id")
+        if not imdb_id:
+            return
+        with self._db_lock:
+            found = self._conn().execute("SELECT tmdb_id, data FROM movies WHERE imdb_id = ?", (imdb_id,)).fetchone()
+        if found:
+            row = {**json.loads(found[1]), **row}
+            self.lru.invalidate(("tmdb_id", str(found[0])))
+        self._replica_put([row])
+        for column in LOOKUP_COLUMNS:
+            self.lru.invalidate((column, str(row.get(column))))
+        self._remember(row)
+
+    def clear(self):
+        # Empties the LRU and the replica (rows and sync mark), as if the process had never read a movie
+        self.lru.clear()
+        with self._db_lock:
+            db = self._conn()
+            db.execute("DELETE FROM movies")
+            db.execute("DELETE FROM sync_state")
+            db.commit()
+
+    # --- sync ---
+
+    def _get_mark(self):
+        with self._db_lock:
+            found = self._conn().execute("SELECT value FROM sync_state WHERE key = 'mark'").fetchone()
+        return json.loads(found[0]) if found else None
+
+    def _set_mark(self, mark):
+        with self._db_lock:
+            db = self._conn()
+            db.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('mark', ?)", (json.dumps(mark),))
+            db.commit()
+
+    def sync(self):
+        # Pulls rows changed since the last mark, keyset-paged on (updated_at, imdb_id). Returns rows pulled.
+        mark = self._get_mark()
+        pulled = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                query = self.supabase.table("movies").select("*").not_.is_("updated_at", "null")
+                if mark:
+                    updated_at, imdb_id = mark
+                    query = query.or_(
+                        f'updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",imdb_id.gt.{imdb_id})'
+                    )
+                rows = query.order("updated_at").order("imdb_id").limit(SYNC_PAGE_SIZE).execute().data
+                if not rows:
+                    break
+                self._replica_put(rows)
+                for row in rows:
+                    for column in LOOKUP_COLUMNS:
+                        self.lru.invalidate((column, str(row.get(column))))
+                mark = [rows[-1]["updated_at"], rows[-1]["imdb_id"]]
+                self._set_mark(mark)
+                pulled += len(rows)
+                if len(rows) < SYNC_PAGE_SIZE:
+                    break
+        except Exception as e:
+            if VERBOSE:
+                print(f"[ERROR] Movie replica sync failed after {pulled} rows: {e}")
+        self.last_sync = time.time()
+        if VERBOSE and pulled:
+            print(f"[CACHE] Movie replica pulled {pulled} changed rows in {time.perf_counter() - start:.2f}s")
+        return pulled
+
+    def start_syncer(self, interval=DEFAULT_SYNC_INTERVAL):
+        if self._syncer and self._syncer.is_alive():
+            return self._syncer
+        self._stop.clear()
+
+        def loop():
+            self.sync()
+            while not self._stop.wait(interval):
+                self.sync()
+
+        self._syncer = threading.Thread(target=loop, name="movie-replica-sync", daemon=True)
+        self._syncer.start()
+        return self._syncer
+
+    def stop_syncer(self):
+        self._stop.set()
+        if self._syncer:
+            self._syncer.join(timeout=5)
+            self._syncer = None
+
+    def stats(self):
+        with self._db_lock:
+            replica_rows = self._conn().execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+        return {
+            "name": "movie_store",
+            "lru": self.lru.stats(),
+            "replica_rows": replica_rows,
+            "replica_hits": self.replica_hits,
+            "remote_hits": self.remote_hits,
+            "remote_misses": self.remote_misses,
+            "remote_errors": self.remote_errors,
+            "last_sync": self.last_sync,
+        }
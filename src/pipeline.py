@@ -0,0 +1,204 @@
+"""
+small streaming pipeline: stages are async generators (or async per-item functions run by a few workers)
+linked by bounded queues, so a slow downstream stage applies backpressure and a stage that has
+seen enough can stop everything upstream. per-stage timings are recorded as items flow through.
+"""
+import asyncio
+import time
+
+DEFAULT_QUEUE_SIZE = 8
+
+_DONE = object()
+
+
+class StageTiming:
+    def __init__(self, name, pipeline_start):
+        self.name = name
+        self._t0 = pipeline_start
+        self.started_ms = None
+        self.first_output_ms = None
+        self.finished_ms = None
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_ms = 0.0
+
+    def _now_ms(self):
+        return (time.perf_counter() - self._t0) * 1000
+
+    def mark_start(self):
+        if self.started_ms is None:
+            self.started_ms = self._now_ms()
+
+    def mark_output(self):
+        self.items_out += 1
+        if self.first_output_ms is None:
+            self.first_output_ms = self._now_ms()
+
+    def mark_finish(self):
+        self.finished_ms = self._now_ms()
+
+    def as_dict(self):
+        wall = None
+        if self.started_ms is not None and self.finished_ms is not None:
+            wall = round(self.finished_ms - self.started_ms, 1)
+        return {
+            "started_ms": round(self.started_ms, 1) if self.started_ms is not None else None,
+            "first_output_ms": round(self.first_output_ms, 1) if self.first_output_ms is not None else None,
+            "finished_ms": round(self.finished_ms, 1) if self.finished_ms is not None else None,
+            "wall_ms": wall,
+            "busy_ms": round(self.busy_ms, 1),
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+        }
+
+
+class _Stage:
+    def __init__(self, name, fn, workers, queue_size, is_map):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.is_map = is_map
+
+
+class Pipeline:
+    def __init__(self, name, queue_size=DEFAULT_QUEUE_SIZE):
+        self.name = name
+        self.queue_size = queue_size
+        self._stages = []
+        self._start = time.perf_counter()
+        self.started_ns = time.time_ns()  # wall clock twin of _start, for exporting stage timings as spans
+        self.timings = {}
+
+    def stream(self, name, fn, queue_size=None):
+        # fn(upstream async iterator) -> async generator
+        self._stages.append(_Stage(name, fn, 1, queue_size or self.queue_size, is_map=False))
+        return self
+
+    def map(self, name, fn, workers=1, queue_size=None):
+        # fn(item) -> awaitable result; None drops the item. Output order follows completion order.
+        self._stages.append(_Stage(name, fn, workers, queue_size or self.queue_size, is_map=True))
+        return self
+
+    def timings_dict(self):
+        return {name: t.as_dict() for name, t in self.timings.items()}
+
+    async def _iter_queue(self, queue, timing):
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            timing.items_in += 1
+            yield item
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._failed.set()
+
+    async def _run_stream(self, stage, upstream, out_q, timing, upstream_tasks):
+        timing.mark_start()
+        try:
+            async for item in stage.fn(upstream):
+                timing.mark_output()
+                await out_q.put(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail(e)
+            raise
+        else:
+            # A stage that returns early has seen enough; stop the work feeding it
+            for task in upstream_tasks:
+                task.cancel()
+            await out_q.put(_DONE)
+        finally:
+            timing.mark_finish()
+
+    async def _run_map(self, stage, in_q, out_q, timing):
+        timing.mark_start()
+
+        async def worker():
+            while True:
+                item = await in_q.get()
+                if item is _DONE:
+                    # Let sibling workers see the end of input too
+                    await in_q.put(_DONE)
+                    return
+                timing.items_in += 1
+                t = time.perf_counter()
+                result = await stage.fn(item)
+                timing.busy_ms += (time.perf_counter() - t) * 1000
+                if result is not None:
+                    timing.mark_output()
+                    await out_q.put(result)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(stage.workers)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail(e)
+            raise
+        else:
+            await out_q.put(_DONE)
+        finally:
+            timing.mark_finish()
+
+    async def run(self, source):
+        # Yields whatever the last stage produces; stopping early cancels every upstream stage
+        self._start = time.perf_counter()
+        self._error = None
+        self._failed = asyncio.Event()
+        src_q = asyncio.Queue(self.queue_size)
+
+        async def feed():
+            try:
+                async for item in _aiter(source):
+                    await src_q.put(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._fail(e)
+                raise
+            await src_q.put(_DONE)
+
+        tasks = [asyncio.create_task(feed())]
+        upstream_q = src_q
+        for stage in self._stages:
+            timing = self.timings[stage.name] = StageTiming(stage.name, self._start)
+            out_q = asyncio.Queue(stage.queue_size)
+            if stage.is_map:
+                coro = self._run_map(stage, upstream_q, out_q, timing)
+            else:
+                coro = self._run_stream(stage, self._iter_queue(upstream_q, timing), out_q, timing, list(tasks))
+            tasks.append(asyncio.create_task(coro))
+            upstream_q = out_q
+
+        failed = asyncio.create_task(self._failed.wait())
+        try:
+            while True:
+                getter = asyncio.create_task(upstream_q.get())
+                # A failing stage never sends its end marker, so watch for failures alongside output
+                await asyncio.wait({getter, failed}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    raise self._error
+                item = getter.result()
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            failed.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _aiter(source):
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            yield item
+    else:
+        for item in source:
+            yield item
@@ -0,0 +1,113 @@
+"""
+ready-to-composite poster sizes, generated once from the w500 originals in the poster store and cached
+next to them (objects/ab/cd/<sha256>.<size>.<ext>). renderers ask for a size and get a file that needs
+no decode-resize-encode at render time. bulk generation runs in a process pool.
+
+    python poster_derivatives.py                 # every poster in the store, all sizes
+    python poster_derivatives.py card,reel 8     # only these sizes, 8 worker processes
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, ImageOps
+
+import poster_store
+
+VERBOSE = True
+
+# name -> (width, height or None to keep aspect, Pillow format, extension, save options)
+SIZES = {
+    "card": (500, 700, "JPEG", ".jpg", {"quality": 88, "optimize": True, "progressive": True}),
+    "reel": (500, None, "JPEG", ".jpg", {"quality": 90, "optimize": True}),
+    "thumb": (185, 278, "WEBP", ".webp", {"quality": 80, "method": 6}),
+}
+
+
+def derivative_path(original_path, size):
+    ext = SIZES[size][3]
+    return os.path.splitext(original_path)[0] + f".{size}{ext}"
+
+
+def render_derivative(original_path, size):
+    # Runs in worker processes, so it only touches its arguments
+    width, height, fmt, _, options = SIZES[size]
+    dest = derivative_path(original_path, size)
+    if os.path.exists(dest):
+        return dest
+    with Image.open(original_path) as img:
+        img = img.convert("RGB")
+        if height is None:
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+        else:
+            # Same crop as the card template's object-fit: cover
+            img = ImageOps.fit(img, (width, height), Image.LANCZOS)
+        # A private temp file: another worker may be rendering the same derivative right now
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, fmt, **options)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    return dest
+
+
+def get_derivative(tmdb_id, size, poster_url=None):
+    # Path of the poster at the given size, generating it in-process if it isn't cached yet
+    original = poster_store.get_local_poster(tmdb_id, poster_url)
+    if not original:
+        return None
+    dest = derivative_path(original, size)
+    if os.path.exists(dest):
+        return dest
+    return render_derivative(original, size)
+
+
+def generate_derivatives(tmdb_ids, sizes=tuple(SIZES), workers=None, poster_urls=None):
+    # Returns {tmdb_id: {size: path}}; posters we can't find locally (or fetch) are skipped
+    poster_urls = poster_urls or {}
+    results = {}
+    pending = {}  # (original, size) -> tmdb_ids; ids sharing a poster share its derivatives
+    for tmdb_id in tmdb_ids:
+        original = poster_store.get_local_poster(tmdb_id, poster_urls.get(tmdb_id))
+        if not original:
+            continue
+        for size in sizes:
+            dest = derivative_path(original, size)
+            if os.path.exists(dest):
+                results.setdefault(tmdb_id, {})[size] = dest
+            else:
+                pending.setdefault((original, size), []).append(tmdb_id)
+    if not pending:
+        return results
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_derivative, original, size): (ids, size) for (original, size), ids in pending.items()}
+        for future in as_completed(futures):
+            ids, size = futures[future]
+            try:
+                path = future.result()
+            except Exception as e:
+                if VERBOSE:
+                    print(f"[ERROR] {size} derivative failed for TMDb ID {', '.join(map(str, ids))}: {e}")
+                continue
+            for tmdb_id in ids:
+                results.setdefault(tmdb_id, {})[size] = path
+    if VERBOSE:
+        print(f"[POSTER] Generated {len(pending)} derivatives in {time.perf_counter() - start:.1f}s")
+    return results
+
+
+if __name__ == "__main__":
+    sizes = sys.argv[1].split(",") if len(sys.argv) > 1 else list(SIZES)
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    poster_store.migrate_legacy()
+    tmdb_ids = poster_store.indexed_ids()
+    generate_derivatives(tmdb_ids, sizes=sizes, workers=workers)
@@ -0,0 +1,201 @@
+"""
+one place for poster images. files are content-addressed (sha256) in a sharded layout,
+data/posters/objects/ab/cd/<sha256>.jpg, with one small data/posters/index/<tmdb_id>.json per poster
+mapping it to its hash, so processes storing posters side by side never overwrite each other's entries.
+downloads run on a small background pool and are deduplicated while in flight, so a poster is
+fetched at most once and never on the request path. the old flat data/posters/{tmdb_id}.jpg files
+are adopted into the store the first time they're asked for (or all at once with `migrate`) and left
+in place, since they're tracked in git.
+
+    python poster_store.py migrate
+    python poster_store.py stats
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import http_get
+
+VERBOSE = True
+
+POSTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "posters"))
+OBJECTS_DIR = os.path.join(POSTER_DIR, "objects")
+INDEX_DIR = os.path.join(POSTER_DIR, "index")
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_TIMEOUT = (3.05, 20)
+
+_lock = threading.Lock()
+_entries = {}  # tmdb_id -> index entry, as read from or written to INDEX_DIR
+_in_flight = {}  # tmdb_id -> Future
+_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="poster-dl")
+
+
+def _object_path(digest, ext=".jpg"):
+    return os.path.join(OBJECTS_DIR, digest[:2], digest[2:4], digest + ext)
+
+
+def _legacy_path(tmdb_id):
+    return os.path.join(POSTER_DIR, f"{tmdb_id}.jpg")
+
+
+def _index_path(tmdb_id):
+    return os.path.join(INDEX_DIR, f"{tmdb_id}.json")
+
+
+def _read_entry(tmdb_id):
+    # Misses aren't remembered: another process may store the poster later
+    key = str(tmdb_id)
+    with _lock:
+        entry = _entries.get(key)
+    if entry is None:
+        try:
+            with open(_index_path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with _lock:
+            _entries[key] = entry
+    return entry
+
+
+def _write_atomic(path, data, mode="wb"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_entry(tmdb_id, entry):
+    _write_atomic(_index_path(tmdb_id), json.dumps(entry), mode="w")
+    with _lock:
+        _entries[str(tmdb_id)] = entry
+
+
+def _store_bytes(tmdb_id, data, source_url=None):
+    digest = hashlib.sha256(data).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    _write_entry(tmdb_id, {"sha256": digest, "bytes": len(data), "url": source_url})
+    return path
+
+
+def _lookup(tmdb_id):
+    entry = _read_entry(tmdb_id)
+    if entry:
+        path = _object_path(entry["sha256"])
+        if os.path.exists(path):
+            return path
+    legacy = _legacy_path(tmdb_id)
+    if os.path.exists(legacy):
+        return _adopt_legacy(tmdb_id, legacy)
+    return None
+
+
+def _adopt_legacy(tmdb_id, legacy):
+    # Copies the flat file into the store; the original stays where it is
+    try:
+        with open(legacy, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return _store_bytes(tmdb_id, data)
+
+
+def _download(tmdb_id, poster_url):
+    try:
+        path = _lookup(tmdb_id)
+        if path:
+            return path
+        r = http_get("tmdb_images", poster_url, timeout=DOWNLOAD_TIMEOUT)
+        path = _store_bytes(tmdb_id, r.content, poster_url)
+        if VERBOSE:
+            print(f"[POSTER] Stored poster for TMDb ID {tmdb_id} ({len(r.content) // 1024} KB)")
+        return path
+    except Exception as e:
+        if VERBOSE:
+            print(f"[ERROR] Poster download failed for TMDb ID {tmdb_id}: {e}")
+        return None
+    finally:
+        with _lock:
+            _in_flight.pop(str(tmdb_id), None)
+
+
+def prefetch(tmdb_id, poster_url):
+    # Schedule a background download; returns a Future resolving to the local path (or None)
+    key = str(tmdb_id)
+    with _lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _in_flight[key] = _pool.submit(_download, tmdb_id, poster_url)
+    return future
+
+
+def poster_key(movie):
+    # Store key for a movie row: its tmdb_id, or its imdb_id for rows that don't have one
+    return movie.get("tmdb_id") or movie.get("imdb_id")
+
+
+def get_local_poster(tmdb_id, poster_url=None, wait=True, timeout=None):
+    # Local path of the poster, downloading it once if we know its URL.
+    # With wait=False a missing poster is only scheduled and None is returned straight away.
+    if tmdb_id is None:
+        return None
+    path = _lookup(tmdb_id)
+    if path or not poster_url:
+        return path
+    future = prefetch(tmdb_id, poster_url)
+    if not wait:
+        return None
+    return future.result(timeout=timeout)
+
+
+def has_poster(tmdb_id):
+    return _lookup(tmdb_id) is not None
+
+
+def indexed_ids():
+    try:
+        names = os.listdir(INDEX_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+
+def migrate_legacy():
+    adopted = 0
+    for fname in sorted(os.listdir(POSTER_DIR)):
+        stem, ext = os.path.splitext(fname)
+        if ext == ".jpg" and stem.isdigit() and not _read_entry(stem):
+            if _adopt_legacy(stem, os.path.join(POSTER_DIR, fname)):
+                adopted += 1
+    return adopted
+
+
+def stats():
+    entries = {tmdb_id: _read_entry(tmdb_id) for tmdb_id in indexed_ids()}
+    index = {tmdb_id: entry for tmdb_id, entry in entries.items() if entry}
+    hashes = {e["sha256"] for e in index.values()}
+    return {
+        "posters": len(index),
+        "unique_files": len(hashes),
+        "bytes": sum(e.get("bytes", 0) for e in {e["sha256"]: e for e in index.values()}.values()),
+        "in_flight": len(_in_flight),
+    }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "migrate":
+        print(f"[✓] Adopted {migrate_legacy()} legacy posters into the content-addressed store.")
+    print(json.dumps(stats(), indent=2))
@@ -1,33 +1,25 @@
 import time
-import functools
-def with_retries(max_attempts=3, delay=1, backoff=2):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            attempts = 0
-            current_delay = delay
-            while attempts < max_attempts:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    attempts += 1
-                    if attempts == max_attempts:
-                        raise
-                    if VERBOSE:
-                        print(f"[RETRY] Attempt {attempts} failed: {e}. Retrying in {current_delay} sec...")
-                    time.sleep(current_delay)
-                    current_delay *= backoff
-        return wrapper
-    return decorator
 from config import WATCH_PROVIDER_MAP
+from cache import TTLCache
+from provider_cache import ProviderCache
+from movie_store import MovieStore
+from pipeline import Pipeline
+from retry_policy import with_retries
+from http_client import http_get
+import poster_store
+from deadline import DEFAULT_DEADLINE_SECONDS, Deadline, current_deadline, use_deadline
+import metrics
+from tracing import current_span, current_trace_id, record_span, span, start_trace, traced
+from singleflight import single_flight
 import os
 import ast
+import asyncio
+import bisect
+import contextlib
+import threading
 import json
 import re
-import requests
 from datetime import datetime
-from dotenv import load_dotenv
-from difflib import get_close_matches
 VERBOSE = True  # Set to False to suppress debug prints
 
 today_str = datetime.now().strftime("%B %d, %Y")
@@ -42,21 +34,87 @@ extract_filters_from_prompt: done
 """
 
 
-# Load credentials
-load_dotenv("../.env.local")
-TMDB_API_KEY = os.getenv("TMDB_API_KEY")
-OMDB_API_KEY = os.getenv("OMDB_API_KEY")
-TMDB_BEARER_TOKEN = os.getenv("TMDB_BEARER_TOKEN")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Credentials and clients are set up on first use: importing this module needs no .env.local, no network
+# and none of the heavy supabase/openai imports, which CLI runs and short-lived workers would otherwise pay for
+TMDB_API_KEY = OMDB_API_KEY = TMDB_BEARER_TOKEN = OPENAI_API_KEY = None
+SUPABASE_URL = SUPABASE_KEY = None
+_env_loaded = False
+_clients_lock = threading.Lock()
+_supabase = None
+_openai = None
+
+def load_env():
+    global _env_loaded, TMDB_API_KEY, OMDB_API_KEY, TMDB_BEARER_TOKEN, OPENAI_API_KEY, SUPABASE_URL, SUPABASE_KEY
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv("../.env.local")
+    TMDB_API_KEY = os.getenv("TMDB_API_KEY")
+    OMDB_API_KEY = os.getenv("OMDB_API_KEY")
+    TMDB_BEARER_TOKEN = os.getenv("TMDB_BEARER_TOKEN")
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    SUPABASE_URL = os.getenv("SUPABASE_URL")
+    SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+    if os.getenv("MOVIEMATCH_STANDINS"):
+        # The stand-ins ignore credentials, but tmdb_auth() refuses to build a request without one
+        TMDB_BEARER_TOKEN = TMDB_BEARER_TOKEN or "stand-in"
+        OMDB_API_KEY = OMDB_API_KEY or "stand-in"
+    _env_loaded = True
+
+def get_supabase():
+    global _supabase
+    if _supabase is None:
+        with _clients_lock:
+            if _supabase is None:
+                load_env()
+                if os.getenv("MOVIEMATCH_STANDINS"):
+                    # Offline run: local stand-ins for TMDb, OMDb, OpenAI and Supabase (see standins.py)
+                    import standins
+                    client = standins.install()[0]
+                else:
+                    from supabase import create_client
+                    client = create_client(SUPABASE_URL, SUPABASE_KEY)
+                # Every query's latency lands in the supabase_query_seconds histogram
+                _supabase = metrics.instrument_supabase(client)
+    return _supabase
+
+def get_openai():
+    global _openai
+    if _openai is None:
+        with _clients_lock:
+            if _openai is None:
+                load_env()
+                if os.getenv("MOVIEMATCH_STANDINS"):
+                    import standins
+                    _openai = standins.install()[1]
+                else:
+                    import openai
+                    openai.api_key = OPENAI_API_KEY
+                    _openai = openai
+    return _openai
 
-# === SUPABASE LOGGING ===
-from supabase import create_client
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-def log_prompt_to_supabase(prompt_text, filters, platforms, top_movies, final_response, used_fallback=False, response_time_ms=None, token_usage=None):
+# Columns added to prompts after the table was created. PostgREST rejects a row naming a column the table
+# lacks, so until a deployment adds them they are left out rather than losing every prompt log.
+OPTIONAL_PROMPT_COLUMNS = ("degradations", "trace_id")
+_missing_prompt_columns = set()
+
+def insert_prompt_row(row):
+    row = {k: v for k, v in row.items() if k not in _missing_prompt_columns}
+    try:
+        get_supabase().table("prompts").insert(row).execute()
+    except Exception as e:
+        missing = {c for c in OPTIONAL_PROMPT_COLUMNS if c in row and f"'{c}'" in str(e)}
+        if not missing:
+            raise
+        _missing_prompt_columns.update(missing)
+        if VERBOSE:
+            print(f"[WARNING] prompts has no {', '.join(sorted(missing))} column; logging without it")
+        insert_prompt_row(row)
+
+@traced("supabase.log_prompt")
+def log_prompt_to_supabase(prompt_text, filters, platforms, top_movies, final_response, used_fallback=False, response_time_ms=None, token_usage=None, degradations=None):
     try:
-        supabase.table("prompts").insert({
+        insert_prompt_row({
             "prompt_text": prompt_text,
             "filters": filters,
             "platforms": platforms,
@@ -64,49 +122,125 @@ def log_prompt_to_supabase(prompt_text, filters, platforms, top_movies, final_re
             "final_response": final_response,
             "used_fallback": used_fallback,
             "response_time_ms": response_time_ms,
-            "token_usage": token_usage
-        }).execute()
+            "token_usage": token_usage,
+            "degradations": degradations or [],
+            "trace_id": current_trace_id()
+        })
         if VERBOSE:
             print("[LOG] Prompt logged to Supabase.")
     except Exception as e:
         if VERBOSE:
             print("[ERROR] Logging to Supabase failed:", e)
 
-# Setup cache dir
 cache_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "movie_cache"))
-os.makedirs(cache_dir, exist_ok=True)
 
-import openai
-openai.api_key = os.getenv("OPENAI_API_KEY")
+GPT_TIMEOUT = 30
+
+def chat_completion(call_site, **kwargs):
+    # Every GPT call goes through here so each one gets a span and metrics with its model and token usage
+    with span(f"gpt.{call_site}", model=kwargs.get("model")) as s:
+        start = time.perf_counter()
+        try:
+            completion = get_openai().chat.completions.create(timeout=gpt_timeout(), **kwargs)
+        except Exception as e:
+            metrics.GPT_REQUESTS.inc(call_site=call_site, status=metrics.status_of(e))
+            raise
+        metrics.GPT_LATENCY.observe(time.perf_counter() - start, call_site=call_site)
+        metrics.GPT_REQUESTS.inc(call_site=call_site, status="ok")
+        usage = getattr(completion, "usage", None)
+        if usage:
+            s.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens, total_tokens=usage.total_tokens)
+            metrics.GPT_TOKENS.inc(usage.prompt_tokens, call_site=call_site, kind="prompt")
+            metrics.GPT_TOKENS.inc(usage.completion_tokens, call_site=call_site, kind="completion")
+        return completion
+
+def gpt_timeout():
+    deadline = current_deadline()
+    return deadline.cap_timeout(GPT_TIMEOUT) if deadline else GPT_TIMEOUT
 
 ######### API LOGGING #########
+_api_log_lock = threading.Lock()  # pipeline stages call upstreams from several threads
+
+API_USAGE_LOG_PATH = os.path.abspath(os.path.join(cache_dir, "..", "api_usage_log.json"))
+
+# Offline runs (see standins.py) are wired up before anything can reach an upstream or open the replica,
+# and keep the usage log, replica, traces and posters out of data/
+if os.getenv("MOVIEMATCH_STANDINS"):
+    import standins
+    standins.install()
+    API_USAGE_LOG_PATH = standins.scratch_path("api_usage_log.json")
+
 def log_api_call(service):
     today = datetime.now().strftime("%Y-%m-%d")
-    path = os.path.join(cache_dir, "..", "api_usage_log.json")
-    log = json.load(open(path)) if os.path.exists(path) else {}
-    log.setdefault(today, {"tmdb": 0, "omdb": 0})
-    log[today][service] += 1
-    with open(path, "w") as f:
-        json.dump(log, f, indent=2)
+    path = API_USAGE_LOG_PATH
+    with _api_log_lock:
+        log = json.load(open(path)) if os.path.exists(path) else {}
+        log.setdefault(today, {"tmdb": 0, "omdb": 0})
+        log[today][service] += 1
+        with open(path, "w") as f:
+            json.dump(log, f, indent=2)
+
+######### UPSTREAM REQUESTS #########
+# Only these thin wrappers retry; circuit breaking and hedging happen underneath in http_client
+TMDB_BASE_URL = "https://api.themoviedb.org/3"
+OMDB_BASE_URL = "http://www.omdbapi.com/"
+
+def tmdb_auth():
+    load_env()
+    headers = {"accept": "application/json"}
+    params = {}
+    if TMDB_BEARER_TOKEN:
+        headers["Authorization"] = f"Bearer {TMDB_BEARER_TOKEN}"
+    elif TMDB_API_KEY:
+        params["api_key"] = TMDB_API_KEY
+    else:
+        raise ValueError("Missing TMDb credentials.")
+    return headers, params
+
+@with_retries()
+def tmdb_get(path, params=None):
+    headers, auth_params = tmdb_auth()
+    r = http_get(
+        "tmdb", f"{TMDB_BASE_URL}{path}",
+        headers=headers, params={**auth_params, **(params or {})},
+        on_request=lambda: log_api_call("tmdb")
+    )
+    return r.json()
 
+@with_retries()
+def omdb_get(params):
+    load_env()
+    r = http_get("omdb", OMDB_BASE_URL, params={"apikey": OMDB_API_KEY, **params}, on_request=lambda: log_api_call("omdb"))
+    return r.json()
 
 # === Keyword Cache for Supabase ===
 _keyword_cache = None
 
-def get_or_fetch_keyword_id(keyword: str):
+@single_flight("keyword_cache", key=lambda: None)
+def load_keyword_cache():
+    # Only fetch from Supabase if not already cached
     global _keyword_cache
+    if _keyword_cache is None:
+        result = get_supabase().table("tmdb_keywords").select("keyword_name,keyword_id").execute()
+        _keyword_cache = result.data if result and result.data else []
+    return _keyword_cache
+
+# Concurrent prompts asking for the same keyword share one lookup, so it is inserted into tmdb_keywords once
+@traced("keyword_lookup")
+@single_flight("keyword")
+def get_or_fetch_keyword_id(keyword: str):
+    current_span().set(keyword=keyword)
     try:
-        # Only fetch from Supabase if not already cached
-        if _keyword_cache is None:
-            result = supabase.table("tmdb_keywords").select("keyword_name,keyword_id").execute()
-            _keyword_cache = result.data if result and result.data else []
+        load_keyword_cache()
 
         keyword_list = [row["keyword_name"] for row in _keyword_cache]
+        from difflib import get_close_matches
         match = get_close_matches(keyword, keyword_list, n=1, cutoff=0.8)
         if match:
             matched_name = match[0]
             matched_id = next((row["keyword_id"] for row in _keyword_cache if row["keyword_name"] == matched_name), None)
             if matched_id:
+                current_span().set(source="fuzzy_match", match=matched_name, keyword_id=matched_id)
                 if VERBOSE:
                     print(f"[FUZZY MATCH] '{keyword}' → '{matched_name}' (ID {matched_id})")
                 return matched_id
@@ -118,26 +252,17 @@ def get_or_fetch_keyword_id(keyword: str):
             print(f"[ERROR] Failed during fuzzy keyword match for '{keyword}':", e)
 
     # Fall back to TMDb API if not found in cache
-    url = "https://api.themoviedb.org/3/search/keyword"
-    headers = {"accept": "application/json", "Authorization": f"Bearer {TMDB_BEARER_TOKEN}"}
-    params = {"query": keyword}
-    @with_retries()
-    def fetch_tmdb_keyword():
-        r = requests.get(url, headers=headers, params=params)
-        log_api_call("tmdb")
-        r.raise_for_status()
-        return r
     try:
-        r = fetch_tmdb_keyword()
-        results = r.json().get("results", [])
+        results = tmdb_get("/search/keyword", {"query": keyword}).get("results", [])
         if not results:
             if VERBOSE:
                 print(f"[WARNING] No TMDb keyword found for '{keyword}'")
             return None
         keyword_id = results[0]["id"]
+        current_span().set(source="tmdb", keyword_id=keyword_id)
         # Insert into Supabase and update local cache
         try:
-            supabase.table("tmdb_keywords").insert({
+            get_supabase().table("tmdb_keywords").insert({
                 "keyword_name": keyword,
                 "keyword_id": keyword_id
             }).execute()
@@ -155,10 +280,48 @@ def get_or_fetch_keyword_id(keyword: str):
         return None
 
 ######### TMDb MOVIE LIST #########
-def get_movies_by_filters(filters):
-    url = "https://api.themoviedb.org/3/discover/movie"
-    headers = {"accept": "application/json", "Authorization": f"Bearer {TMDB_BEARER_TOKEN}"}
-    movies = []
+# Discover pages are cached by canonical filters so repeated genre/year combos cost no TMDb calls
+DISCOVER_CACHE_TTL = 6 * 60 * 60
+discover_cache = TTLCache("discover", maxsize=512, ttl=DISCOVER_CACHE_TTL)
+
+# Keys whose values are comma (AND) or pipe (OR) separated TMDb ID lists
+ID_LIST_FILTER_KEYS = {
+    "with_genres", "without_genres", "with_keywords", "without_keywords",
+    "with_watch_providers", "with_companies", "with_cast", "with_crew", "with_people",
+}
+
+def canonicalize_filters(filters):
+    canonical = {}
+    for key, value in (filters or {}).items():
+        if value is None or value == "" or value == []:
+            continue
+        key = str(key).strip()
+        if key in ID_LIST_FILTER_KEYS:
+            if isinstance(value, (list, tuple, set)):
+                value = ",".join(str(v) for v in value)
+            value = str(value).replace(" ", "")
+            sep = "|" if "|" in value else ","
+            ids = sorted({v for v in value.split(sep) if v}, key=lambda v: (not v.isdigit(), int(v) if v.isdigit() else 0, v))
+            if not ids:
+                continue
+            value = sep.join(ids)
+        elif isinstance(value, bool):
+            value = str(value).lower()
+        elif isinstance(value, float):
+            value = str(int(value)) if value.is_integer() else str(value)
+        else:
+            value = str(value).strip()
+            if re.fullmatch(r"-?\d+\.0+", value):
+                value = value.split(".")[0]
+        canonical[key] = value
+    return dict(sorted(canonical.items()))
+
+def _discover_cache_key(canonical, page):
+    return (tuple(canonical.items()), page)
+
+def iter_discover_pages(filters):
+    # Yields one list of movies per discover page so callers can start work before paging finishes
+    filters = canonicalize_filters(filters)
     # Dynamically determine number of pages based on specificity
     base_pages = 2
     if filters.get("with_keywords") and filters.get("with_genres") and filters.get("primary_release_year"):
@@ -169,24 +332,124 @@ def get_movies_by_filters(filters):
         base_pages = 1  # fallback or vague prompts
 
     for page in range(1, base_pages + 1):
-        params = {"language": "en-US", "page": page, "include_adult": "false", **filters}
-        try:
-            r = requests.get(url, headers=headers, params=params)
-            log_api_call("tmdb")
-            r.raise_for_status()
-            for m in r.json().get("results", []):
-                movies.append({"title": m["title"], "year": m["release_date"][:4]})
-        except Exception as e:
-            if VERBOSE:
-                print("[ERROR] Discover failed:", e)
+        cache_key = _discover_cache_key(filters, page)
+        # The span must close before the yield: the generator resumes in a different thread context
+        with span("tmdb.discover", page=page) as s:
+            page_movies = discover_cache.get(cache_key)
+            s.set(cache="hit" if page_movies is not None else "miss")
+            if page_movies is not None:
+                if VERBOSE:
+                    print(f"[CACHE] Discover page {page} hit for {filters}")
+            else:
+                params = {"language": "en-US", "page": page, "include_adult": "false", **filters}
+                try:
+                    data = tmdb_get("/discover/movie", params)
+                    page_movies = [
+                        {
+                            "title": m["title"],
+                            "year": (m.get("release_date") or "")[:4],
+                            "tmdb_id": m.get("id"),
+                            "vote_average": m.get("vote_average"),
+                            "vote_count": m.get("vote_count"),
+                            "popularity": m.get("popularity"),
+                        }
+                        for m in data.get("results", [])
+                    ]
+                    discover_cache.set(cache_key, page_movies)
+                    s.set(results=len(page_movies))
+                except Exception as e:
+                    s.fail(e)
+                    if VERBOSE:
+                        print("[ERROR] Discover failed:", e)
+        if page_movies is None:
             break
-    return movies
+        yield page_movies
+
+def get_movies_by_filters(filters):
+    return [movie for page in iter_discover_pages(filters) for movie in page]
+
+######### CANDIDATE PLANNING #########
+# Rating filters need a vote floor or discover returns obscure titles with a handful of votes
+RATED_MIN_VOTE_COUNT = 100
+MIN_CANDIDATE_VOTE_COUNT = 10
+MIN_CANDIDATES_AFTER_PRUNE = 10
+
+def plan_discover_filters(filters):
+    # Push platform and rating constraints into the discover query so TMDb does the filtering
+    planned = dict(filters)
+    if planned.get("with_watch_providers"):
+        planned.setdefault("watch_region", DEFAULT_WATCH_REGION)
+        planned.setdefault("with_watch_monetization_types", "flatrate")
+    if planned.get("vote_average.gte"):
+        planned.setdefault("vote_count.gte", RATED_MIN_VOTE_COUNT)
+    return canonicalize_filters(planned)
+
+def prune_candidates(candidates, filters, seen=None):
+    # Cheap pruning on discover fields, before any enrichment call is spent
+    def to_float(val):
+        try:
+            return float(val)
+        except (TypeError, ValueError):
+            return None
+
+    min_rating = to_float(filters.get("vote_average.gte"))
+    min_votes = to_float(filters.get("vote_count.gte"))
+    seen = set() if seen is None else seen
+    kept = []
+    for movie in candidates:
+        key = movie.get("tmdb_id") or (movie.get("title", "").lower(), movie.get("year"))
+        if key in seen:
+            continue
+        seen.add(key)
+        rating = to_float(movie.get("vote_average"))
+        votes = to_float(movie.get("vote_count"))
+        # Titles without discover fields (fallback/local cache) can't be judged here
+        if min_rating is not None and rating is not None and rating < min_rating:
+            continue
+        if min_votes is not None and votes is not None and votes < min_votes:
+            continue
+        kept.append(movie)
+
+    # Drop barely-voted titles only when enough well-known ones remain
+    voted = [m for m in kept if to_float(m.get("vote_count")) is None or to_float(m.get("vote_count")) >= MIN_CANDIDATE_VOTE_COUNT]
+    if len(voted) >= MIN_CANDIDATES_AFTER_PRUNE:
+        kept = voted
+    kept.sort(key=lambda m: to_float(m.get("popularity")) or 0, reverse=True)
+    if VERBOSE:
+        print(f"[PLAN] Pruned candidates on discover fields — {len(kept)} of {len(candidates)} kept.")
+    return kept
+
+def iter_planned_candidate_pages(filters):
+    planned = plan_discover_filters(filters)
+    seen = set()
+    found = False
+    for page in iter_discover_pages(planned):
+        found = found or bool(page)
+        yield prune_candidates(page, planned, seen)
+    if not found and planned != canonicalize_filters(filters):
+        # Provider data on discover can lag; retry without the pushed-down constraints
+        if VERBOSE:
+            print("[PLAN] Pushed-down discover query was empty — retrying with the original filters.")
+        for page in iter_discover_pages(filters):
+            yield prune_candidates(page, planned, seen)
+
+def get_planned_candidates(filters):
+    return [movie for page in iter_planned_candidate_pages(filters) for movie in page]
+
+# TMDb's genre list barely ever changes; one Supabase read a day is plenty
+GENRE_MAP_TTL = 24 * 60 * 60
+genre_cache = TTLCache("genres", maxsize=1, ttl=GENRE_MAP_TTL)
 
 def load_genre_map():
+    genre_map = genre_cache.get("genres")
+    if genre_map is not None:
+        return dict(genre_map)
     try:
-        result = supabase.table("tmdb_genres").select("*").execute()
+        result = get_supabase().table("tmdb_genres").select("*").execute()
         if result and result.data:
-            return {str(row["genre_id"]): row["genre_name"] for row in result.data}
+            genre_map = {str(row["genre_id"]): row["genre_name"] for row in result.data}
+            genre_cache.set("genres", genre_map)
+            return dict(genre_map)
         else:
             return {}
     except Exception as e:
@@ -208,11 +471,17 @@ def extract_filters_from_prompt(prompt: str) -> dict:
         {"role": "system", "content": system_msg},
         {"role": "user", "content": prompt}
     ]
-    completion = openai.chat.completions.create(
-        model="gpt-4",
-        messages=messages,
-        temperature=0
-    )
+    try:
+        completion = chat_completion(
+            "extract_filters",
+            model="gpt-4",
+            messages=messages,
+            temperature=0
+        )
+    except Exception as e:
+        if VERBOSE:
+            print("[ERROR] Filter extraction failed:", e)
+        return {}
     response = completion.choices[0].message.content
     try:
         filters = ast.literal_eval(response)
@@ -238,54 +507,85 @@ def extract_filters_from_prompt(prompt: str) -> dict:
             print("Failed to parse GPT response:", response)
         return {}
     
+######### WATCH PROVIDERS #########
+# Streaming availability lives in its own cache with a shorter TTL than the movie record
+PROVIDER_CACHE_TTL = 2 * 60 * 60
+DEFAULT_WATCH_REGION = "US"
+
+@traced("tmdb.providers")
+def fetch_watch_providers(tmdb_id):
+    data = tmdb_get(f"/movie/{tmdb_id}/watch/providers")
+    return {
+        region: [s["provider_name"] for s in info.get("flatrate", [])]
+        for region, info in data.get("results", {}).items()
+    }
+
+provider_cache = ProviderCache(fetch_watch_providers, ttl=PROVIDER_CACHE_TTL)
+
+def get_streaming_services(tmdb_id, region=DEFAULT_WATCH_REGION):
+    with span("providers", tmdb_id=tmdb_id, region=region) as s:
+        deadline = current_deadline()
+        if deadline and deadline.should("stale_providers"):
+            # Out of time for upstream checks; whatever we last saw is the best answer
+            s.set(cache="stale")
+            return provider_cache.peek(tmdb_id, region, allow_stale=True) or []
+        s.set(cache="hit" if provider_cache.peek(tmdb_id, region) is not None else "miss")
+        return provider_cache.get(tmdb_id, region)
+
 ######### TMDb & OMDb DETAILS #########
-@with_retries()
-def get_tmdb_data(title):
-    headers = {"accept": "application/json"}
+@traced("tmdb.search")
+@single_flight("tmdb_search")
+def search_tmdb_id(title):
+    current_span().set(title=title)
     params = {"query": title, "include_adult": "false", "language": "en-US", "page": 1}
-    if TMDB_BEARER_TOKEN:
-        headers["Authorization"] = f"Bearer {TMDB_BEARER_TOKEN}"
-    elif TMDB_API_KEY:
-        params["api_key"] = TMDB_API_KEY
-    else:
-        raise ValueError("Missing TMDb credentials.")
+    try:
+        results = tmdb_get("/search/movie", params).get("results", [])
+        current_span().set(results=len(results), tmdb_id=results[0]["id"] if results else None)
+        return results[0]["id"] if results else None
+    except Exception as e:
+        if VERBOSE:
+            print("[ERROR] TMDb search failed:", e)
+        return None
 
+@traced("tmdb.details")
+@single_flight("tmdb_details")
+def get_tmdb_details(movie_id):
+    current_span().set(tmdb_id=movie_id)
     try:
-        r = requests.get("https://api.themoviedb.org/3/search/movie", headers=headers, params=params)
-        log_api_call("tmdb")
-        r.raise_for_status()
-        results = r.json().get("results", [])
-        if not results:
-            return None
-        movie_id = results[0]["id"]
-        details = requests.get(f"https://api.themoviedb.org/3/movie/{movie_id}", headers=headers).json()
-        credits = requests.get(f"https://api.themoviedb.org/3/movie/{movie_id}/credits", headers=headers).json()
-        providers = requests.get(f"https://api.themoviedb.org/3/movie/{movie_id}/watch/providers", headers=headers).json()
-        us_sources = providers.get("results", {}).get("US", {}).get("flatrate", [])
+        # Credits ride along on the details call instead of costing a second request
+        details = tmdb_get(f"/movie/{movie_id}", {"append_to_response": "credits"})
+        credits = details.get("credits", {})
+        poster_path = details.get("poster_path")
         return {
             "tmdb_id": movie_id,
             "imdb_id": details.get("imdb_id"),
             "title": details.get("title"),
-            "year": details.get("release_date", "")[:4],
+            "year": (details.get("release_date") or "")[:4],
             "genres": [g["name"] for g in details.get("genres", [])],
             "runtime": details.get("runtime"),
             "director": next((c["name"] for c in credits.get("crew", []) if c["job"] == "Director"), "Unknown"),
             "cast": [a["name"] for a in credits.get("cast", [])[:5]],
             "plot": details.get("overview"),
-            "streaming_services": [s["provider_name"] for s in us_sources]
+            "streaming_services": get_streaming_services(movie_id),
+            "poster_url": f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else None
         }
     except Exception as e:
         if VERBOSE:
             print("[ERROR] TMDb fetch failed:", e)
         return None
 
-@with_retries()
+def get_tmdb_data(title):
+    movie_id = search_tmdb_id(title)
+    if not movie_id:
+        return None
+    return get_tmdb_details(movie_id)
+
+@traced("omdb.ratings")
+@single_flight("omdb")
 def get_omdb_data(imdb_id):
+    current_span().set(imdb_id=imdb_id)
     try:
-        r = requests.get("http://www.omdbapi.com/", params={"apikey": OMDB_API_KEY, "i": imdb_id})
-        log_api_call("omdb")
-        r.raise_for_status()
-        data = r.json()
+        data = omdb_get({"i": imdb_id})
         ratings = {r["Source"]: r["Value"] for r in data.get("Ratings", [])}
         return {
             "imdb_rating": data.get("imdbRating"),
@@ -297,16 +597,9 @@ def get_omdb_data(imdb_id):
             print("[ERROR] OMDb fetch failed:", e)
         return {}
 
-@with_retries()
 def get_poster_url(tmdb_id):
     try:
-        headers = {"accept": "application/json"}
-        if TMDB_BEARER_TOKEN:
-            headers["Authorization"] = f"Bearer {TMDB_BEARER_TOKEN}"
-        url = f"https://api.themoviedb.org/3/movie/{tmdb_id}"
-        r = requests.get(url, headers=headers)
-        r.raise_for_status()
-        data = r.json()
+        data = tmdb_get(f"/movie/{tmdb_id}")
         poster_path = data.get("poster_path")
         if poster_path:
             return f"https://image.tmdb.org/t/p/w500{poster_path}"
@@ -316,31 +609,114 @@ def get_poster_url(tmdb_id):
             print(f"[ERROR] Failed to fetch poster URL for TMDb ID {tmdb_id}: {e}")
         return None
 
-def get_combined_data(title):
-    tmdb = get_tmdb_data(title)
+# Movie rows are read through an in-process LRU and a local SQLite replica before going to Supabase
+movie_store = MovieStore(get_supabase)
+
+@single_flight("movie_store", key=lambda column, value: (column, value))
+def get_supabase_movie(column, value):
+    return movie_store.get(column, value)
+
+def fetched_unhurried(result):
+    # A movie enriched under skip_omdb has no ratings; requests with time to spare fetch their own
+    deadline = current_deadline()
+    return not (deadline and "skip_omdb" in deadline.degradations)
+
+@traced("get_combined_data")
+@single_flight(
+    "combined_data", key=lambda title, tmdb_id=None: ("tmdb_id", tmdb_id) if tmdb_id else ("title", title),
+    share_if=fetched_unhurried,
+)
+def get_combined_data(title, tmdb_id=None):
+    current_span().set(title=title, tmdb_id=tmdb_id)
+    if tmdb_id:
+        # Discover already gave us the id; a stored row saves the TMDb round trips entirely
+        movie = get_supabase_movie("tmdb_id", tmdb_id)
+        if movie:
+            current_span().set(source="movie_store", imdb_id=movie.get("imdb_id"))
+            if VERBOSE:
+                print(f"[SUPABASE] Loaded cached data for {title} (TMDb {tmdb_id}) from Supabase.")
+            movie["streaming_services"] = get_streaming_services(tmdb_id)
+            return movie
+        tmdb = get_tmdb_details(tmdb_id)
+    else:
+        tmdb = get_tmdb_data(title)
     if not tmdb:
+        current_span().set(source="not_found")
         return {"title": title, "note": "TMDb not found"}
     imdb_id = tmdb.get("imdb_id")
     tmdb_id = tmdb.get("tmdb_id")
-    # Retrieve poster URL after getting tmdb_id
-    poster_url = get_poster_url(tmdb_id)
+    poster_url = tmdb.get("poster_url")
+    current_span().set(tmdb_id=tmdb_id, imdb_id=imdb_id)
     if VERBOSE:
         print(f"[✓] Poster URL for {title}: {poster_url}")
     # Check Supabase first for existing movie data
-    existing = supabase.table("movies").select("*").eq("imdb_id", imdb_id).execute()
-    if existing and existing.data:
+    movie = get_supabase_movie("imdb_id", imdb_id)
+    if movie:
         if VERBOSE:
             print(f"[SUPABASE] Loaded cached data for {title} ({imdb_id}) from Supabase.")
-        return existing.data[0]
+        current_span().set(source="movie_store")
+        # The stored row's availability may be stale; overlay the provider cache
+        movie["streaming_services"] = get_streaming_services(movie.get("tmdb_id") or tmdb_id)
+        return movie
+    deadline = current_deadline()
+    if deadline and deadline.should("skip_omdb"):
+        # Don't store a row without ratings; the next unhurried request will fill it in
+        current_span().set(source="tmdb_only")
+        return {**tmdb, "poster_url": poster_url}
     omdb = get_omdb_data(imdb_id)
     full = {**tmdb, **omdb, "poster_url": poster_url}
+    current_span().set(source="fetched")
     # Optionally still write to local cache for debugging, but no longer used for reads
     push_movie_to_supabase(full)
     if VERBOSE:
         print(f"[SUPABASE] Pushed new data for {title} ({imdb_id}) to Supabase.")
     return full
 
+######### ENRICHMENT #########
+# Candidates are checked for provider availability first and only survivors are fully enriched
+TOP_MOVIE_COUNT = 10
+MAX_ENRICH_CANDIDATES = 30
+MIN_MOVIES_BEFORE_STREAMING_FILTER = 5
+
+def get_allowed_platforms(filters):
+    if not filters.get("with_watch_providers"):
+        return []
+    provider_ids = re.split(r"[,|]", str(filters["with_watch_providers"]))
+    allowed_platforms = [WATCH_PROVIDER_MAP.get(pid.strip()) for pid in provider_ids if pid.strip() in WATCH_PROVIDER_MAP]
+    return [p for p in allowed_platforms if p]
+
+def check_candidate_availability(movie, allowed_platforms, region=DEFAULT_WATCH_REGION, search=search_tmdb_id):
+    # Returns the candidate with its tmdb_id and current services, or None if it can't be streamed as asked
+    title = movie.get("title")
+    tmdb_id = movie.get("tmdb_id") or search(title)
+    if not tmdb_id:
+        return None
+    deadline = current_deadline()
+    if deadline and deadline.should("stale_providers") and provider_cache.peek(tmdb_id, region, allow_stale=True) is None:
+        # No time to check and nothing cached: can't satisfy a platform filter, but keep the movie otherwise
+        if allowed_platforms:
+            return None
+        return {**movie, "tmdb_id": tmdb_id, "streaming_services": [], "availability_unknown": True}
+    services = get_streaming_services(tmdb_id, region)
+    if allowed_platforms and not any(s in allowed_platforms for s in services):
+        return None
+    return {**movie, "tmdb_id": tmdb_id, "streaming_services": services}
+
+def rating_sort_key(m):
+    def to_float(val):
+        try:
+            return float(val.strip('%')) if isinstance(val, str) else float(val)
+        except:
+            return -1
+
+    rt = to_float(m.get("rotten_tomatoes"))
+    imdb = to_float(m.get("imdb_rating"))
+    meta = to_float(m.get("metascore"))
+    return (rt, imdb, meta)
+
+@traced("supabase.upsert_movie")
 def push_movie_to_supabase(movie_data):
+    current_span().set(imdb_id=movie_data.get("imdb_id"))
     try:
         if not movie_data.get("imdb_id", "").startswith("tt"):
             return
@@ -371,7 +747,7 @@ def push_movie_to_supabase(movie_data):
             metascore = None
 
         # Check if movie already exists
-        existing = supabase.table("movies").select("imdb_id").eq("imdb_id", imdb_id).execute()
+        existing = get_supabase().table("movies").select("imdb_id").eq("imdb_id", imdb_id).execute()
         is_new = not existing.data
 
         # Use poster_url from movie_data if present
@@ -395,24 +771,15 @@ def push_movie_to_supabase(movie_data):
             "poster_url": poster_url
         }
 
-        # Save poster locally if poster_url is present
+        # Poster download happens in the background store; never on the request path
         if poster_url:
-            posters_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "posters"))
-            os.makedirs(posters_dir, exist_ok=True)
-            poster_file = os.path.join(posters_dir, f"{movie_data.get('tmdb_id')}.jpg")
-            if not os.path.exists(poster_file):
-                try:
-                    img_data = requests.get(poster_url).content
-                    with open(poster_file, "wb") as f:
-                        f.write(img_data)
-                except Exception as e:
-                    if VERBOSE:
-                        print(f"[ERROR] Failed to save poster locally for {movie_data.get('title')}: {e}")
+            poster_store.prefetch(movie_data.get("tmdb_id"), poster_url)
 
         if is_new:
             movie_payload["created_at"] = datetime.utcnow().isoformat()
 
-        result = supabase.table("movies").upsert(movie_payload, on_conflict="imdb_id").execute()
+        result = get_supabase().table("movies").upsert(movie_payload, on_conflict="imdb_id").execute()
+        movie_store.refresh(result.data[0] if result and result.data else movie_payload)
 
         if result and result.data:
             if VERBOSE:
@@ -436,7 +803,8 @@ def get_fallback_titles_from_gpt(prompt: str) -> list:
         "\"While I couldn’t find detailed info on [title], here are some similar movies you might enjoy...\"\n"
         "Then give 5–10 movie suggestions with a short reason if possible."
     )
-    fallback_response = openai.chat.completions.create(
+    fallback_response = chat_completion(
+        "fallback_titles",
         model="gpt-4",
         messages=[
             {
@@ -467,20 +835,30 @@ def get_fallback_titles_from_gpt(prompt: str) -> list:
             candidates.append({"title": title})
     return candidates
 
-def recommend_movies_from_prompt(prompt: str):
-    if VERBOSE:
-        print(f"[INFO] User Prompt: {prompt}")
-    
-    # Step 1: Extract filters from prompt using ChatGPT
-    filters = extract_filters_from_prompt(prompt)
-    if VERBOSE:
-        print(f"[INFO] Extracted Filters: {filters}")
-
-    # Fallback keyword injection from local keyword list is disabled.
-    if "with_keywords" not in filters:
-        if VERBOSE:
-            print("[INFO] Local keyword fallback is disabled in recommend_movies_from_prompt.")
+def find_local_cache_candidates(prompt, filters):
+    candidates = []
+    if not os.path.isdir(cache_dir):
+        return candidates
+    for fname in os.listdir(cache_dir):
+        if not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(cache_dir, fname)) as f:
+                data = json.load(f)
+            title = data.get("title", "").lower()
+            year = data.get("year")
+            if (
+                str(filters.get("primary_release_year")) == str(year)
+                and any(k.lower() in title for k in prompt.split())
+            ):
+                candidates.append({"title": data["title"]})
+        except Exception as e:
+            continue
+    return candidates
 
+def iter_candidates(prompt, filters, ctx):
+    # Candidate source: discover pages when we have filters, otherwise the prompt-as-movie or GPT fallbacks
+    found = False
     if not filters.get("with_keywords") and not filters.get("with_genres"):
         if VERBOSE:
             print("[INFO] No strong filters detected — attempting to enrich the user prompt as a movie.")
@@ -497,98 +875,105 @@ def recommend_movies_from_prompt(prompt: str):
 
             if VERBOSE:
                 print(f"[INFO] Extracted fallback filters from prompt movie: {filters}")
-            candidates = get_movies_by_filters(filters)
+            for page in iter_planned_candidate_pages(filters):
+                for movie in page:
+                    found = True
+                    yield movie
         else:
             if VERBOSE:
                 print("[INFO] No usable movie info found from prompt — falling back to GPT.")
-            candidates = get_fallback_titles_from_gpt(prompt)
     else:
-        candidates = get_movies_by_filters(filters)
+        for page in iter_planned_candidate_pages(filters):
+            for movie in page:
+                found = True
+                yield movie
 
-        if not candidates:
+        if not found:
             if VERBOSE:
                 print("[INFO] No TMDb results — attempting to match from local cache...")
-            for fname in os.listdir(cache_dir):
-                if not fname.endswith(".json"):
-                    continue
-                try:
-                    with open(os.path.join(cache_dir, fname)) as f:
-                        data = json.load(f)
-                    title = data.get("title", "").lower()
-                    year = data.get("year")
-                    genres = [g.lower() for g in data.get("genres", [])]
-                    if (
-                        str(filters.get("primary_release_year")) == str(year)
-                        and any(k.lower() in title for k in prompt.split())
-                    ):
-                        candidates.append({"title": data["title"]})
-                except Exception as e:
-                    continue
-            if candidates:
+            local = find_local_cache_candidates(prompt, filters)
+            if local:
                 if VERBOSE:
-                    print(f"[INFO] Found {len(candidates)} matching locally cached movies.")
-
-    if not candidates:
-        candidates = get_fallback_titles_from_gpt(prompt)
-
-    enriched_movies = []
-    for movie in candidates[:30]:
-        title = movie.get("title")
-        if VERBOSE:
-            print(f"[ENRICHING] Fetching detailed info for: {title}")
-        data = get_combined_data(title)
-        if data and data.get("title"):
-            enriched_movies.append(data)
-
-    if not enriched_movies and candidates:
-        if VERBOSE:
-            print("[INFO] Fallback mode — skipping scoring filter. Enriched all fallback titles based on GPT output.")
-    else:
-        if VERBOSE:
-            print(f"[INFO] Enriched data for {len(candidates[:30])} movies, usable: {len(enriched_movies)}")
-
-    if not enriched_movies:
-        if VERBOSE:
-            print("[INFO] No enriched movies with full data — fallback formatting may be GPT-generated.")
-
-    if len(enriched_movies) > 5:
-        enriched_movies = [m for m in enriched_movies if m.get("streaming_services")]
+                    print(f"[INFO] Found {len(local)} matching locally cached movies.")
+                found = True
+                yield from local
 
-    if filters.get("with_watch_providers"):
-        provider_ids = filters["with_watch_providers"].split(",")
-        allowed_platforms = [WATCH_PROVIDER_MAP.get(pid.strip()) for pid in provider_ids if pid.strip() in WATCH_PROVIDER_MAP]
-        allowed_platforms = [p for p in allowed_platforms if p]
+    if not found:
+        ctx.used_fallback = True
+        yield from get_fallback_titles_from_gpt(prompt)
 
-        before_count = len(enriched_movies)
-        enriched_movies = [
-            m for m in enriched_movies
-            if any(service in allowed_platforms for service in m.get("streaming_services", []))
-        ]
-        if VERBOSE:
-            print(f"[INFO] Streaming platform filter applied — {len(enriched_movies)} of {before_count} movies kept.")
-
-    def sort_key(m):
-        def to_float(val):
-            try:
-                return float(val.strip('%')) if isinstance(val, str) else float(val)
-            except:
-                return -1
-
-        rt = to_float(m.get("rotten_tomatoes"))
-        imdb = to_float(m.get("imdb_rating"))
-        meta = to_float(m.get("metascore"))
-        return (rt, imdb, meta)
-
-    enriched_movies.sort(key=sort_key, reverse=True)
-
-    top_movies = enriched_movies[:10]
+def format_local_recommendation(top_movies, count=5):
+    # Used when the deadline leaves no room for the final GPT call
+    if not top_movies:
+        return "Sorry, we couldn't find matching movies in time. Try a slightly different prompt."
+    lines = ["Here are our top picks based on ratings and streaming availability:"]
+    for i, m in enumerate(top_movies[:count], 1):
+        details = []
+        if m.get("imdb_rating") not in (None, "", "N/A"):
+            details.append(f"IMDb {m['imdb_rating']}")
+        rt = m.get("rotten_tomatoes")
+        if rt not in (None, "", "N/A"):
+            details.append(f"Rotten Tomatoes {rt}" if str(rt).endswith("%") else f"Rotten Tomatoes {rt}%")
+        if m.get("streaming_services"):
+            details.append("on " + ", ".join(m["streaming_services"]))
+        line = f"{i}. {m.get('title')} ({m.get('year')})"
+        lines.append(line + (" — " + ", ".join(details) if details else ""))
+    return "\n".join(lines)
 
+def generate_recommendation(ctx, top_movies):
     if VERBOSE:
         print(f"[INFO] Top {len(top_movies)} movies selected for GPT recommendation.")
 
     # Step 3: Use GPT to select and format top 5 recommendations
+    prompt = ctx.prompt
+    filters = ctx.filters
     start_time = time.time()
-    response = openai.chat.completions.create(
+    response = None
+    if not ctx.deadline.should("local_answer"):
+        try:
+            response = call_recommendation_gpt(prompt, top_movies)
+        except Exception as e:
+            if VERBOSE:
+                print("[ERROR] Final GPT call failed — answering from local ranking:", e)
+            ctx.deadline.apply("local_answer", cascade=False)
+    elapsed_ms = int((time.time() - start_time) * 1000)
+    if response is not None:
+        usage_tokens = getattr(response, "usage", None)
+        if usage_tokens:
+            usage_tokens = usage_tokens.total_tokens
+        recommendation = response.choices[0].message.content
+    else:
+        usage_tokens = None
+        recommendation = format_local_recommendation(top_movies)
+    platforms = filters.get("with_watch_providers", "").split(",") if filters.get("with_watch_providers") else []
+    degradations = list(ctx.deadline.degradations)
+    # Log prompt and results to Supabase
+    log_prompt_to_supabase(
+        prompt_text=prompt,
+        filters=filters,
+        platforms=platforms,
+        top_movies=top_movies,
+        final_response=recommendation,
+        used_fallback=ctx.used_fallback,
+        response_time_ms=elapsed_ms,
+        token_usage=usage_tokens,
+        degradations=degradations
+    )
+    return {
+        "prompt": prompt,
+        "filters": filters,
+        "platforms": platforms,
+        "top_movies": top_movies,
+        "recommendation": recommendation,
+        "used_fallback": ctx.used_fallback,
+        "response_time_ms": elapsed_ms,
+        "token_usage": usage_tokens,
+        "degradations": degradations,
+    }
+
+def call_recommendation_gpt(prompt, top_movies):
+    return chat_completion(
+        "recommend",
         model="gpt-4",
         messages=[
             {
@@ -603,24 +988,191 @@ def recommend_movies_from_prompt(prompt: str):
         ],
         temperature=0.7
     )
-    elapsed_ms = int((time.time() - start_time) * 1000)
-    usage_tokens = getattr(response, "usage", None)
-    if usage_tokens:
-        usage_tokens = usage_tokens.total_tokens
-    # Log prompt and results to Supabase
-    log_prompt_to_supabase(
-        prompt_text=prompt,
-        filters=filters,
-        platforms=filters.get("with_watch_providers", "").split(",") if filters.get("with_watch_providers") else [],
-        top_movies=top_movies,
-        final_response=response.choices[0].message.content,
-        used_fallback=not bool(candidates),
-        response_time_ms=elapsed_ms,
-        token_usage=usage_tokens
+
+######### RECOMMENDATION PIPELINE #########
+# filter extraction → candidate source → resolve → enrich → filter → rank → generate,
+# streamed through bounded queues so enrichment overlaps discover paging and stops at TOP_MOVIE_COUNT
+PIPELINE_QUEUE_SIZE = 5
+DEGRADED_MAX_CANDIDATES = TOP_MOVIE_COUNT
+RESOLVE_WORKERS = 4
+ENRICH_WORKERS = 4
+
+class RecommendationContext:
+    def __init__(self, prompt, deadline, enrichment=None):
+        self.prompt = prompt
+        self.deadline = deadline
+        # Shared across prompts by batch runs (batch.SharedEnrichment); None looks every candidate up directly
+        self.enrichment = enrichment
+        self.filters = {}
+        self.allowed_platforms = []
+        self.region = DEFAULT_WATCH_REGION
+        self.used_fallback = False
+        self.no_streaming = []  # available nowhere; only used to top up small result sets
+
+async def iterate_in_thread(gen):
+    # Steps a blocking generator from a worker thread so the event loop stays free
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, gen, done)
+        if item is done:
+            return
+        yield item
+
+async def extract_filters_stage(prompts, ctx):
+    async for prompt in prompts:
+        filters = await asyncio.to_thread(extract_filters_from_prompt, prompt)
+        if VERBOSE:
+            print(f"[INFO] Extracted Filters: {filters}")
+        ctx.filters = filters
+        ctx.allowed_platforms = get_allowed_platforms(filters)
+        ctx.region = filters.get("watch_region", DEFAULT_WATCH_REGION)
+        yield filters
+
+async def candidate_source_stage(filters_stream, ctx):
+    async for filters in filters_stream:
+        count = 0
+        async for movie in iterate_in_thread(iter_candidates(ctx.prompt, filters, ctx)):
+            yield movie
+            count += 1
+            if count >= MAX_ENRICH_CANDIDATES:
+                break
+            if count >= DEGRADED_MAX_CANDIDATES and ctx.deadline.should("cut_candidates"):
+                break
+
+async def resolve_candidate(movie, ctx):
+    search = ctx.enrichment.search_tmdb_id if ctx.enrichment else search_tmdb_id
+    movie = await asyncio.to_thread(check_candidate_availability, movie, ctx.allowed_platforms, ctx.region, search)
+    if movie and not movie["streaming_services"] and not movie.get("availability_unknown"):
+        ctx.no_streaming.append(movie)
+        return None
+    return movie
+
+async def enrich_candidate(movie, ctx):
+    if VERBOSE:
+        print(f"[ENRICHING] Fetching detailed info for: {movie.get('title')}")
+    fetch = ctx.enrichment.get_combined_data if ctx.enrichment else get_combined_data
+    data = await asyncio.to_thread(fetch, movie.get("title"), movie.get("tmdb_id"))
+    return data if data and data.get("tmdb_id") else None
+
+async def filter_stage(movies, ctx):
+    kept = 0
+    deadline = ctx.deadline
+    while True:
+        # Only wait for more movies while the budget still leaves room to rank and answer
+        wait = deadline.time_until("cut_candidates")
+        if wait <= 0:
+            deadline.apply("cut_candidates")
+            break
+        try:
+            movie = await asyncio.wait_for(anext(movies), timeout=wait)
+        except StopAsyncIteration:
+            break
+        except asyncio.TimeoutError:
+            deadline.apply("cut_candidates")
+            break
+        yield movie
+        kept += 1
+        if kept >= TOP_MOVIE_COUNT:
+            if VERBOSE:
+                print(f"[INFO] Collected {kept} usable movies — stopping enrichment early.")
+            return
+
+    # Without a platform filter, small result sets keep titles that aren't streaming anywhere
+    cut = "cut_candidates" in deadline.degradations
+    if not cut and not ctx.allowed_platforms and kept <= MIN_MOVIES_BEFORE_STREAMING_FILTER:
+        for movie in ctx.no_streaming:
+            if kept >= TOP_MOVIE_COUNT:
+                break
+            data = await enrich_candidate(movie, ctx)
+            if data:
+                yield data
+                kept += 1
+    if VERBOSE:
+        print(f"[INFO] Usable enriched movies: {kept}")
+    if not kept and VERBOSE:
+        print("[INFO] No enriched movies with full data — fallback formatting may be GPT-generated.")
+
+async def rank_stage(movies, ctx):
+    # Insert as movies arrive so ranking work overlaps enrichment
+    ranked = []
+    async for movie in movies:
+        bisect.insort(ranked, movie, key=lambda m: tuple(-v for v in rating_sort_key(m)))
+    yield ranked[:TOP_MOVIE_COUNT]
+
+async def generate_stage(ranked_lists, ctx):
+    async for top_movies in ranked_lists:
+        yield await asyncio.to_thread(generate_recommendation, ctx, top_movies)
+
+def build_recommendation_pipeline(ctx):
+    return (
+        Pipeline("recommend", queue_size=PIPELINE_QUEUE_SIZE)
+        .stream("extract_filters", lambda up: extract_filters_stage(up, ctx))
+        .stream("candidates", lambda up: candidate_source_stage(up, ctx))
+        .map("resolve", lambda m: resolve_candidate(m, ctx), workers=RESOLVE_WORKERS)
+        .map("enrich", lambda m: enrich_candidate(m, ctx), workers=ENRICH_WORKERS)
+        .stream("filter", lambda up: filter_stage(up, ctx))
+        .stream("rank", lambda up: rank_stage(up, ctx))
+        .stream("generate", lambda up: generate_stage(up, ctx))
     )
 
+async def recommend_movies_from_prompt_async(prompt: str, budget_seconds=DEFAULT_DEADLINE_SECONDS, enrichment=None) -> dict:
+    if VERBOSE:
+        print(f"[INFO] User Prompt: {prompt}")
+    # Serves /metrics if MOVIEMATCH_METRICS_PORT is set; a no-op once running. The replica syncer is started by the
+    # long-running entry points (service.py, batch.py), so one-off scripts don't pull the whole movies table
+    metrics.start_http_server()
+    deadline = Deadline(budget_seconds)
+    ctx = RecommendationContext(prompt, deadline, enrichment)
+    pipeline = build_recommendation_pipeline(ctx)
+    result = None
+    # Every stage, thread hop and upstream call below sees this deadline and trace through context variables
+    with start_trace("recommend", prompt=prompt, budget_s=budget_seconds) as root, use_deadline(deadline):
+        async with contextlib.aclosing(pipeline.run([prompt])) as outputs:
+            async for result in outputs:
+                pass
+        if result is None:
+            # The generate stage yields exactly one result; none means a stage ended the stream early
+            raise RuntimeError(f"Recommendation pipeline produced no result for {prompt!r}")
+        result["timings"] = pipeline.timings_dict()
+        for stage, t in pipeline.timings.items():
+            if t.started_ms is not None and t.finished_ms is not None:
+                record_span(
+                    f"stage.{stage}",
+                    pipeline.started_ns + int(t.started_ms * 1e6), pipeline.started_ns + int(t.finished_ms * 1e6),
+                    items_in=t.items_in, items_out=t.items_out, busy_ms=round(t.busy_ms, 1),
+                )
+        root.set(
+            movies=len(result["top_movies"]), used_fallback=result["used_fallback"],
+            degradations=result["degradations"], filters=json.dumps(result["filters"]),
+        )
+    result["trace_id"] = root.trace_id
+    result["elapsed_ms"] = int(deadline.elapsed() * 1000)
+    outcome = "fallback" if result["used_fallback"] else "degraded" if result["degradations"] else "ok"
+    metrics.RECOMMENDATION_LATENCY.observe(deadline.elapsed(), outcome=outcome)
+    for degradation in result["degradations"]:
+        metrics.DEGRADATIONS.inc(degradation=degradation)
+    if VERBOSE and result["degradations"]:
+        print(f"[DEADLINE] Degradations applied: {', '.join(result['degradations'])}")
+    if VERBOSE:
+        for stage, t in result["timings"].items():
+            print(f"[TIMING] {stage}: {t['wall_ms']} ms wall, {t['items_out']} out")
+    return result
+
+def warm_caches():
+    # Loads what every request needs before the first one arrives; used by long-running entry points
+    load_genre_map()
+    try:
+        load_keyword_cache()
+    except Exception as e:
+        if VERBOSE:
+            print("[ERROR] Failed to preload keyword cache:", e)
+
+def recommend_movies_from_prompt(prompt: str):
+    result = asyncio.run(recommend_movies_from_prompt_async(prompt))
     print("\n====== RECOMMENDATIONS ======")
-    print(response.choices[0].message.content)
+    print(result["recommendation"])
+    return result
+
 if __name__ == "__main__":
     user_input = input("What kind of movie are you looking for?\n> ")
-    recommend_movies_from_prompt(user_input)
\ No newline at end of file
+    recommend_movies_from_prompt(user_input)
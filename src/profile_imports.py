@@ -0,0 +1,96 @@
+"""
+import-time report built on `python -X importtime`. imports the module in fresh interpreters (so nothing is
+cached in sys.modules), takes the median of several runs, and lists the slowest imports by cumulative and
+self time. run it before and after touching module-level imports to see what a cold start costs.
+
+    python profile_imports.py                          # production_v1, 5 runs, top 15
+    python profile_imports.py --module=create_ig_posts --runs=10 --top=25
+    python profile_imports.py --json > import_times.json
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULE = "production_v1"
+DEFAULT_RUNS = 5
+DEFAULT_TOP = 15
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(module):
+    # One fresh interpreter: {name: (self_us, cumulative_us, depth)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return times
+
+
+def profile(module, runs=DEFAULT_RUNS):
+    samples = [import_times(module) for _ in range(runs)]
+    names = set().union(*samples)
+    merged = {}
+    for name in names:
+        present = [s[name] for s in samples if name in s]
+        merged[name] = {
+            "self_ms": round(statistics.median(p[0] for p in present) / 1000, 2),
+            "cumulative_ms": round(statistics.median(p[1] for p in present) / 1000, 2),
+            "depth": present[0][2],
+        }
+    return {
+        "module": module,
+        "runs": runs,
+        "total_ms": merged.get(module, {}).get("cumulative_ms"),
+        "modules_loaded": len(names),
+        "imports": merged,
+    }
+
+
+def print_report(report, top=DEFAULT_TOP):
+    imports = report["imports"]
+    print(f"====== import {report['module']}: {report['total_ms']} ms "
+          f"(median of {report['runs']}, {report['modules_loaded']} modules) ======")
+    print("\nBy cumulative time (the module plus everything it imported first):")
+    by_cumulative = sorted(imports.items(), key=lambda i: i[1]["cumulative_ms"], reverse=True)
+    for name, t in by_cumulative[:top]:
+        print(f"{t['cumulative_ms']:>10.2f} ms  {'  ' * t['depth']}{name}")
+    print("\nBy self time:")
+    by_self = sorted(imports.items(), key=lambda i: i[1]["self_ms"], reverse=True)
+    for name, t in by_self[:top]:
+        print(f"{t['self_ms']:>10.2f} ms  {name}")
+
+
+def parse_args(argv):
+    options = {"module": DEFAULT_MODULE, "runs": DEFAULT_RUNS, "top": DEFAULT_TOP, "json": False}
+    for arg in argv:
+        name, _, value = arg.lstrip("-").partition("=")
+        if name == "json":
+            options["json"] = True
+        elif name in ("runs", "top"):
+            options[name] = int(value)
+        elif name == "module":
+            options["module"] = value
+        else:
+            raise SystemExit(f"Unknown option {arg!r}")
+    return options
+
+
+if __name__ == "__main__":
+    options = parse_args(sys.argv[1:])
+    report = profile(options["module"], options["runs"])
+    if options["json"]:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, options["top"])
@@ -0,0 +1,168 @@
+"""
+watch-provider availability cache, kept apart from the movie record because it goes stale much faster.
+entries are per (tmdb_id, region) with their own fetched_at/ttl, and a background thread
+can keep the most-requested titles fresh.
+"""
+import threading
+import time
+from collections import Counter
+
+from metrics import CACHE_LOOKUPS
+from singleflight import group
+
+VERBOSE = True
+
+DEFAULT_PROVIDER_TTL = 2 * 60 * 60
+DEFAULT_REFRESH_INTERVAL = 10 * 60
+
+
+class ProviderCache:
+    def __init__(self, fetch_fn, ttl=DEFAULT_PROVIDER_TTL, maxsize=5000):
+        # fetch_fn(tmdb_id) -> {region: [provider names]} for every region TMDb knows about
+        self.fetch_fn = fetch_fn
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._entries = {}  # (tmdb_id, region) -> {"providers", "fetched_at", "ttl"}
+        self._requests = Counter()  # tmdb_id -> number of lookups
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def _key(self, tmdb_id, region):
+        return (str(tmdb_id), (region or "US").upper())
+
+    def _is_fresh(self, entry, now=None):
+        return (now or time.time()) - entry["fetched_at"] < entry["ttl"]
+
+    def peek(self, tmdb_id, region="US", allow_stale=False):
+        # Memory-only lookup; never touches the network
+        with self._lock:
+            entry = self._entries.get(self._key(tmdb_id, region))
+        if entry and (allow_stale or self._is_fresh(entry)):
+            return list(entry["providers"])
+        return None
+
+    def get(self, tmdb_id, region="US"):
+        if tmdb_id is None:
+            return []
+        key = self._key(tmdb_id, region)
+        with self._lock:
+            self._requests[key[0]] += 1
+            self._prune_requests_locked()
+            entry = self._entries.get(key)
+            if entry and self._is_fresh(entry):
+                self.hits += 1
+                CACHE_LOOKUPS.inc(cache="providers", result="hit")
+                return list(entry["providers"])
+            self.misses += 1
+            CACHE_LOOKUPS.inc(cache="providers", result="miss")
+        if self.refresh(key[0], key[1]):
+            return self.peek(tmdb_id, region, allow_stale=True) or []
+        if entry:
+            # Upstream failed; stale availability is better than none
+            with self._lock:
+                self.stale_hits += 1
+            CACHE_LOOKUPS.inc(cache="providers", result="stale")
+            return list(entry["providers"])
+        return []
+
+    def put(self, tmdb_id, by_region, fetched_at=None, regions=()):
+        # regions: ones asked for that must be cached even when the response has nothing for them
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            # Regions missing from the response have no providers (any more)
+            empty = {k for k in self._entries if k[0] == str(tmdb_id)} | {self._key(tmdb_id, r) for r in regions}
+            for key in empty:
+                if key[1] not in by_region:
+                    self._entries[key] = {"providers": [], "fetched_at": fetched_at, "ttl": self.ttl}
+            for region, providers in by_region.items():
+                self._entries[self._key(tmdb_id, region)] = {
+                    "providers": list(providers),
+                    "fetched_at": fetched_at,
+                    "ttl": self.ttl,
+                }
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if len(self._entries) <= self.maxsize:
+            return
+        # Drop the oldest fetches of the least requested titles first
+        ordered = sorted(self._entries, key=lambda k: (self._requests[k[0]], self._entries[k]["fetched_at"]))
+        for key in ordered[:len(self._entries) - self.maxsize]:
+            del self._entries[key]
+
+    def _prune_requests_locked(self):
+        # Counts are kept for cached titles only and halved, so the counter stays bounded and follows recent traffic
+        if len(self._requests) <= 2 * self.maxsize:
+            return
+        cached = {k[0] for k in self._entries}
+        self._requests = Counter({t: n // 2 for t, n in self._requests.items() if t in cached and n // 2})
+
+    def refresh(self, tmdb_id, region=None):
+        try:
+            # Lookups that miss on the same title at once share one upstream fetch
+            by_region = group.do("providers", tmdb_id, self.fetch_fn, tmdb_id)
+        except Exception as e:
+            if VERBOSE:
+                print(f"[ERROR] Provider refresh failed for TMDb ID {tmdb_id}: {e}")
+            return False
+        if by_region is None:
+            return False
+        self.put(tmdb_id, by_region, regions=[region] if region else ())
+        return True
+
+    def most_requested(self, n=50):
+        with self._lock:
+            return [tmdb_id for tmdb_id, _ in self._requests.most_common(n)]
+
+    def refresh_most_requested(self, top_n=50):
+        # Re-check popular titles once they are past half their TTL so reads stay fresh
+        now = time.time()
+        refreshed = 0
+        for tmdb_id in self.most_requested(top_n):
+            with self._lock:
+                entries = [e for k, e in self._entries.items() if k[0] == tmdb_id]
+            if entries and all(now - e["fetched_at"] < e["ttl"] / 2 for e in entries):
+                continue
+            if self.refresh(tmdb_id):
+                refreshed += 1
+        if VERBOSE and refreshed:
+            print(f"[PROVIDERS] Background refresh updated {refreshed} titles.")
+        return refreshed
+
+    def start_refresher(self, interval=DEFAULT_REFRESH_INTERVAL, top_n=50):
+        if self._refresher and self._refresher.is_alive():
+            return self._refresher
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.refresh_most_requested(top_n)
+
+        self._refresher = threading.Thread(target=loop, name="provider-refresher", daemon=True)
+        self._refresher.start()
+        return self._refresher
+
+    def stop_refresher(self):
+        self._stop.set()
+        if self._refresher:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "name": "providers",
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,162 @@
+"""
+purpose-built reel renderer: the static background+logo frame and every sprite (title, poster, ratings row)
+are rendered once with Pillow, each frame is the static frame with the active sprites alpha-blended in with
+NumPy, and raw RGB frames are piped straight into ffmpeg. frames identical to the previous one (holds
+between animations) are not recomposited. no MoviePy, no ImageMagick.
+"""
+import functools
+import subprocess
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from card_pillow import get_font, load_asset, text_width, wrap_text
+
+W, H = 768, 1152
+FPS = 24
+DURATION = 6.0
+BG_COLOR = "#0F1C2E"
+TEXT_COLOR = "#FFFFFF"
+X264_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p", "-movflags", "+faststart"]
+
+# Layout and timeline (seconds), matching the original MoviePy reel
+TITLE_SIZE, TITLE_TOP, TITLE_MARGIN = 48, 80, 50
+TITLE_START, TITLE_END, TITLE_FADE = 0.0, 2.5, 0.5
+POSTER_TOP, POSTER_SLIDE = 180, 100
+POSTER_START, POSTER_END, POSTER_FADE = 1.2, 4.7, 0.7
+RATING_SIZE, RATING_TOP, ICON_HEIGHT, ICON_GAP, BLOCK_GAP = 40, 1000, 44, 12, 60
+RATING_START, RATING_END, RATING_FADE = 3.5, DURATION, 0.5
+
+
+def ffmpeg_exe():
+    # MoviePy's imageio-ffmpeg ships a static binary; otherwise use whatever is on PATH
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        return "ffmpeg"
+
+
+class Sprite:
+    # Premultiplied float32 pixels, so a blend is one multiply-add per channel
+    def __init__(self, image):
+        rgba = np.asarray(image.convert("RGBA"), dtype=np.float32) / 255.0
+        self.alpha = rgba[..., 3:4]
+        self.premult = rgba[..., :3] * self.alpha * 255.0
+        self.h, self.w = self.alpha.shape[:2]
+
+
+def blend(frame, sprite, x, y, opacity=1.0):
+    # Alpha-blends sprite into the uint8 frame in place at (x, y), clipped to the frame
+    x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + sprite.w, W), min(y + sprite.h, H)
+    if opacity <= 0 or x0 >= x1 or y0 >= y1:
+        return
+    sx, sy = x0 - x, y0 - y
+    alpha = sprite.alpha[sy:sy + y1 - y0, sx:sx + x1 - x0] * opacity
+    region = frame[y0:y1, x0:x1].astype(np.float32)
+    region *= 1.0 - alpha
+    region += sprite.premult[sy:sy + y1 - y0, sx:sx + x1 - x0] * opacity
+    frame[y0:y1, x0:x1] = (region + 0.5).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=1)
+def static_frame():
+    frame = Image.new("RGB", (W, H), BG_COLOR)
+    logo = load_asset("logo.png", width=130)
+    frame.paste(logo, (W - 140, 30), logo)
+    return np.array(frame)
+
+
+def title_sprite(title):
+    font = get_font(TITLE_SIZE)
+    lines = wrap_text(title, TITLE_SIZE, W - 2 * TITLE_MARGIN)
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    img = Image.new("RGBA", (W - 2 * TITLE_MARGIN, line_height * len(lines)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(lines):
+        draw.text((img.width / 2, i * line_height), line, font=font, fill=TEXT_COLOR, anchor="ma")
+    return Sprite(img)
+
+
+def ratings_sprite(rt_score, imdb_rating):
+    font = get_font(RATING_SIZE)
+    blocks = [(load_asset("rt.png", height=ICON_HEIGHT), rt_score), (load_asset("imdb.png", height=ICON_HEIGHT), imdb_rating)]
+    width = sum(icon.width + ICON_GAP + round(text_width(text, RATING_SIZE)) for icon, text in blocks)
+    width += BLOCK_GAP * (len(blocks) - 1)
+    img = Image.new("RGBA", (width, ICON_HEIGHT), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    x = 0
+    for icon, text in blocks:
+        img.paste(icon, (x, 0), icon)
+        x += icon.width + ICON_GAP
+        draw.text((x, ICON_HEIGHT / 2), text, font=font, fill=TEXT_COLOR, anchor="lm")
+        x += round(text_width(text, RATING_SIZE)) + BLOCK_GAP
+    return Sprite(img)
+
+
+def _fade(t, start, fade):
+    return min(1.0, (t - start) / fade) if fade else 1.0
+
+
+def build_tracks(movie, poster_path):
+    # (sprite, start, end, position(t) -> (x, y), opacity(t))
+    title = title_sprite(f"{movie['title']} ({movie['year']})")
+    with Image.open(poster_path) as poster_img:
+        poster = Sprite(poster_img)
+    ratings = ratings_sprite(f"{movie['rotten_tomatoes']}%", str(movie["imdb_rating"]))
+    return [
+        (title, TITLE_START, TITLE_END,
+         lambda t: ((W - title.w) // 2, TITLE_TOP),
+         lambda t: _fade(t, TITLE_START, TITLE_FADE)),
+        (poster, POSTER_START, POSTER_END,
+         lambda t: ((W - poster.w) // 2, int(POSTER_TOP + POSTER_SLIDE * (1 - _fade(t, POSTER_START, POSTER_FADE)))),
+         lambda t: _fade(t, POSTER_START, POSTER_FADE)),
+        (ratings, RATING_START, RATING_END,
+         lambda t: ((W - ratings.w) // 2, RATING_TOP),
+         lambda t: _fade(t, RATING_START, RATING_FADE)),
+    ]
+
+
+def iter_frames(tracks, fps=FPS, duration=DURATION):
+    # Yields raw RGB frame bytes; a frame whose sprite state matches the previous one is reused as is
+    base = static_frame()
+    previous_state, previous_bytes = None, None
+    for i in range(int(round(duration * fps))):
+        t = i / fps
+        state = tuple(
+            (n, *position(t), round(opacity(t), 3))
+            for n, (sprite, start, end, position, opacity) in enumerate(tracks)
+            if start <= t < end
+        )
+        if state != previous_state:
+            frame = base.copy()
+            for n, x, y, alpha in state:
+                blend(frame, tracks[n][0], x, y, alpha)
+            previous_state, previous_bytes = state, frame.tobytes()
+        yield previous_bytes
+
+
+def render_reel(movie, poster_path, output_path, fps=FPS):
+    tracks = build_tracks(movie, poster_path)
+    cmd = [
+        ffmpeg_exe(), "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{W}x{H}", "-r", str(fps), "-i", "-",
+        *X264_ARGS, output_path,
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for frame in iter_frames(tracks, fps):
+            proc.stdin.write(frame)
+        proc.stdin.close()
+    except BrokenPipeError:
+        # ffmpeg died; its stderr says why
+        pass
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    stderr = proc.stderr.read().decode(errors="replace")
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg exited with {proc.returncode}: {stderr.strip()}")
+    return output_path
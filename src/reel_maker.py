@@ -1,54 +1,90 @@
-from moviepy.editor import *
-from PIL import ImageColor
+"""
+batch reel generator. each reel is 6 seconds of title, sliding poster, ratings and logo rendered by
+reel_engine; a batch is spread over a process pool, and each worker builds the static background+logo
+frame once and reuses it for every reel it makes. outputs are written to a temp file and moved into place.
+
+    python reel_maker.py                      # 5 top-rated movies, one worker per core
+    python reel_maker.py horror --count=10 --workers=4
+"""
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from slugify import slugify
+
+import reel_engine
+from poster_derivatives import get_derivative
+from poster_store import poster_key
+
+VERBOSE = True
+
+OUTPUT_DIR = "data/output"
+DEFAULT_COUNT = 5
+
+
+def reel_output_path(movie):
+    # The id keeps movies that share a title (remakes) from overwriting each other's reel
+    return os.path.join(OUTPUT_DIR, f"{slugify(movie['title'])}-{movie['imdb_id']}-reel.mp4")
+
+
+def render_reel(movie):
+    # Runs in a worker process; returns (output path, seconds taken)
+    start = time.perf_counter()
+    poster_path = get_derivative(poster_key(movie), "reel", movie.get("poster_url"))
+    if not poster_path:
+        raise FileNotFoundError(f"no poster for {movie['title']}")
+    output_path = reel_output_path(movie)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Keep the .mp4 suffix so ffmpeg still picks the container from the extension
+    tmp_path = output_path[:-len(".mp4")] + f".{os.getpid()}.tmp.mp4"
+    try:
+        reel_engine.render_reel(movie, poster_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path, time.perf_counter() - start
+
+
+def render_reels(movies, workers=None):
+    # Returns {imdb_id: output path or exception}; logs each reel's render time as it finishes
+    start = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=reel_engine.static_frame) as pool:
+        futures = {pool.submit(render_reel, movie): movie for movie in movies}
+        for future in as_completed(futures):
+            movie = futures[future]
+            title = movie["title"]
+            try:
+                output_path, seconds = future.result()
+                results[movie["imdb_id"]] = output_path
+                if VERBOSE:
+                    print(f"[✓] Reel for {title} in {seconds:.1f}s -> {output_path}")
+            except Exception as e:
+                results[movie["imdb_id"]] = e
+                print(f"❌ Failed to render reel for {title}: {e}")
+    if VERBOSE:
+        done = sum(1 for r in results.values() if not isinstance(r, Exception))
+        print(f"[RENDER] {done}/{len(movies)} reels in {time.perf_counter() - start:.1f}s")
+    return results
+
+
+def parse_args(argv):
+    genre_filter, count, workers = None, DEFAULT_COUNT, None
+    for arg in argv:
+        if arg.startswith("--count="):
+            count = int(arg.split("=", 1)[1])
+        elif arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+        else:
+            genre_filter = arg.lower()
+    return genre_filter, count, workers
+
+
+if __name__ == "__main__":
+    # Same movie selection as the IG posts
+    from create_ig_posts import select_movies
 
-# --- Movie Info (sample) ---
-movie = {
-    "title": "The Dark Knight",
-    "year": 2008,
-    "imdb_rating": 9.0,
-    "rotten_tomatoes": 94,
-}
-
-# --- Paths ---
-poster_path = "../data/posters/11.jpg"  # Local poster image
-logo_path = "../data/templates/logo.PNG"
-output_path = "data/output/the-dark-knight-reel.mp4"
-bg_color = "#0F1C2E"
-font = "Arial-Bold"  # Adjust if this fails to render
-
-# --- Video Constants ---
-W, H = 768, 1152
-duration = 6
-
-# --- Background ---
-bg = ColorClip(size=(W, H), color=ImageColor.getrgb(bg_color), duration=duration)
-
-# --- Title ---
-title_text = TextClip(
-    f"{movie['title']} ({movie['year']})",
-    fontsize=48,
-    font=font,
-    color="white",
-    method="caption",
-    size=(W - 100, None),
-).set_position(("center", 80)).set_start(0).set_duration(2.5).fadein(0.5)
-
-# --- Poster ---
-poster = ImageClip(poster_path).resize(width=500)
-poster = poster.set_position(lambda t: ("center", int(180 + 100 * (1 - min(t / 0.7, 1)))))
-poster = poster.set_start(1.2).set_duration(3.5).fadein(0.7)
-
-# --- Ratings ---
-rt = TextClip(f"🍅 {movie['rotten_tomatoes']}%", fontsize=40, font=font, color="white")
-imdb = TextClip(f"⭐ {movie['imdb_rating']}", fontsize=40, font=font, color="white")
-rt = rt.set_position((W//2 - 150, 1000)).set_start(3.5).set_duration(duration - 3.5).fadein(0.5)
-imdb = imdb.set_position((W//2 + 50, 1000)).set_start(3.5).set_duration(duration - 3.5).fadein(0.5)
-
-# --- Logo ---
-logo = ImageClip(logo_path).resize(width=130)
-logo = logo.set_position((W - 140, 30)).set_start(0).set_duration(duration)
-
-# --- Final Composite ---
-final = CompositeVideoClip([bg, title_text, poster, rt, imdb, logo])
-final.write_videofile(output_path, fps=24)
\ No newline at end of file
+    genre_filter, count, workers = parse_args(sys.argv[1:])
+    render_reels(select_movies(genre_filter, k=count), workers=workers)
@@ -0,0 +1,163 @@
+"""
+retry policy for upstream calls: only transient errors are retried (timeouts, connection resets, 429, 5xx),
+Retry-After is honoured, and backoff uses full jitter. with_retries works on both plain and async functions;
+the async path sleeps with asyncio.sleep so it never blocks the event loop.
+"""
+import asyncio
+import functools
+import random
+import sys
+import threading
+import time
+
+from deadline import current_deadline
+from metrics import RETRIES, RETRY_GIVE_UPS, RETRY_WAIT
+from tracing import current_span
+
+VERBOSE = True
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30
+
+
+def get_status_code(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(exc):
+    # requests is only imported once something made a request; if it isn't loaded, exc can't be one of its errors
+    requests = sys.modules.get("requests")
+    if requests and isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    status = get_status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return False
+
+
+def retry_after_seconds(exc):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime  # HTTP-date form is rare; keep email.* off the import path
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryStats:
+    # Per-operation counters for /healthz; read with retry_stats(). /metrics gets the same numbers from metrics.py
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, name, field, amount=1):
+        with self._lock:
+            op = self._ops.setdefault(name, {"calls": 0, "retries": 0, "give_ups": 0, "retry_wait_s": 0.0})
+            op[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(op, retry_wait_s=round(op["retry_wait_s"], 3)) for name, op in self._ops.items()}
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+
+
+stats = RetryStats()
+
+
+def retry_stats():
+    return stats.snapshot()
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, retry_on=is_retryable, name=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.name = name
+
+    def compute_delay(self, attempt, exc=None):
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)], unless the server told us how long to wait
+        retry_after = retry_after_seconds(exc) if exc is not None else None
+        if retry_after is not None:
+            return min(retry_after, MAX_RETRY_AFTER)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _should_retry(self, attempt, exc, name, delay):
+        deadline = current_deadline()
+        out_of_time = deadline is not None and deadline.remaining() <= delay
+        if attempt >= self.max_attempts or out_of_time or not self.retry_on(exc):
+            stats.record(name, "give_ups")
+            RETRY_GIVE_UPS.inc(operation=name)
+            return False
+        return True
+
+    def _log_retry(self, name, attempt, exc, delay):
+        stats.record(name, "retries")
+        stats.record(name, "retry_wait_s", delay)
+        RETRIES.inc(operation=name)
+        RETRY_WAIT.inc(delay, operation=name)
+        # Counted on the caller's span (e.g. tmdb.details); each attempt has its own http span below it
+        current_span().incr("retries").event("retry", fn=name, attempt=attempt, error=str(exc), delay_s=round(delay, 3))
+        if VERBOSE:
+            print(f"[RETRY] {name} attempt {attempt} failed: {exc}. Retrying in {delay:.2f} sec...")
+
+    def call(self, fn, *args, **kwargs):
+        name = self.name or getattr(fn, "__qualname__", "call")
+        stats.record(name, "calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self.compute_delay(attempt - 1, e)
+                if not self._should_retry(attempt, e, name, delay):
+                    raise
+                self._log_retry(name, attempt, e, delay)
+                time.sleep(delay)
+
+    async def acall(self, fn, *args, **kwargs):
+        name = self.name or getattr(fn, "__qualname__", "call")
+        stats.record(name, "calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self.compute_delay(attempt - 1, e)
+                if not self._should_retry(attempt, e, name, delay):
+                    raise
+                self._log_retry(name, attempt, e, delay)
+                await asyncio.sleep(delay)
+
+
+def with_retries(max_attempts=3, delay=0.5, max_delay=8.0, retry_on=is_retryable, name=None):
+    def decorator(func):
+        policy = RetryPolicy(max_attempts, delay, max_delay, retry_on, name or func.__qualname__)
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await policy.acall(func, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return policy.call(func, *args, **kwargs)
+        return wrapper
+    return decorator
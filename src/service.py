@@ -0,0 +1,152 @@
+"""
+long-running HTTP service for the recommender. one process, one event loop: caches (discover, providers,
+movie LRU + replica, genre map, keyword list), pooled upstream sessions and the Supabase/OpenAI clients stay
+warm across requests, and concurrent requests share them. the blocking parts of the pipeline run on a thread
+pool sized for that concurrency.
+
+    python service.py                      # listens on 0.0.0.0:8080
+    python service.py --port=9000 --quiet
+
+    POST /recommend  {"prompt": "...", "budget_seconds": 8}  -> filters, top_movies, recommendation, timings, ...
+    GET  /healthz    liveness plus cache/upstream stats
+    GET  /metrics    Prometheus text format (see metrics.py)
+"""
+import asyncio
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from aiohttp import web
+
+import deadline
+import metrics
+import movie_store
+import poster_store
+import production_v1
+import provider_cache
+import retry_policy
+import singleflight
+from deadline import DEFAULT_DEADLINE_SECONDS
+from http_client import http_stats
+
+VERBOSE = True
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8080
+MAX_CONCURRENT_REQUESTS = 32
+# Each request keeps a handful of pipeline threads busy (resolve/enrich workers, paging, generation)
+THREAD_POOL_SIZE = 128
+MAX_PROMPT_LENGTH = 500
+MAX_BUDGET_SECONDS = 30.0
+
+_dumps = partial(json.dumps, default=str)
+
+
+def error_response(status, message):
+    return web.json_response({"error": message}, status=status, dumps=_dumps)
+
+
+async def recommend(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return error_response(400, "Body must be JSON")
+    prompt = body.get("prompt") if isinstance(body, dict) else None
+    if not isinstance(prompt, str) or not prompt.strip():
+        return error_response(400, "prompt must be a non-empty string")
+    prompt = prompt.strip()
+    if len(prompt) > MAX_PROMPT_LENGTH:
+        return error_response(400, f"Prompt is longer than {MAX_PROMPT_LENGTH} characters")
+    try:
+        budget = body.get("budget_seconds")
+        budget = DEFAULT_DEADLINE_SECONDS if budget is None else float(budget)
+    except (TypeError, ValueError):
+        budget = None
+    if budget is None or not math.isfinite(budget) or budget <= 0:
+        return error_response(400, "budget_seconds must be a positive number")
+    budget = min(budget, MAX_BUDGET_SECONDS)
+
+    async with request.app["slots"]:
+        try:
+            result = await production_v1.recommend_movies_from_prompt_async(prompt, budget_seconds=budget)
+        except Exception as e:
+            if VERBOSE:
+                print(f"[ERROR] Recommendation failed for {prompt!r}: {e}")
+            return error_response(500, "Recommendation failed")
+    return web.json_response(result, dumps=_dumps)
+
+
+async def healthz(request):
+    return web.json_response({
+        "status": "ok",
+        "uptime_s": round(time.monotonic() - request.app["started"], 1),
+        "caches": {
+            "discover": production_v1.discover_cache.stats(),
+            "genres": production_v1.genre_cache.stats(),
+            "providers": production_v1.provider_cache.stats(),
+            "movies": production_v1.movie_store.stats(),
+        },
+        "upstreams": http_stats(),
+        "retries": retry_policy.retry_stats(),
+        "singleflight": singleflight.group.stats(),
+    }, dumps=_dumps)
+
+
+async def metrics_endpoint(request):
+    return web.Response(text=metrics.registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def on_startup(app):
+    loop = asyncio.get_running_loop()
+    # asyncio.to_thread uses the default executor; its stock size (cpus + 4) would cap concurrent requests
+    app["executor"] = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="recommend")
+    loop.set_default_executor(app["executor"])
+    app["slots"] = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    app["started"] = time.monotonic()
+    await asyncio.to_thread(production_v1.warm_caches)
+    production_v1.movie_store.start_syncer()
+    production_v1.provider_cache.start_refresher()
+    if VERBOSE:
+        print(f"[SERVICE] Ready: up to {MAX_CONCURRENT_REQUESTS} concurrent requests on {THREAD_POOL_SIZE} threads")
+
+
+async def on_cleanup(app):
+    production_v1.provider_cache.stop_refresher()
+    production_v1.movie_store.stop_syncer()
+    app["executor"].shutdown(wait=False, cancel_futures=True)
+
+
+def create_app():
+    app = web.Application()
+    app.router.add_post("/recommend", recommend)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics_endpoint)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def parse_args(argv):
+    options = {"host": DEFAULT_HOST, "port": DEFAULT_PORT, "quiet": False}
+    for arg in argv:
+        name, _, value = arg.lstrip("-").partition("=")
+        if name == "quiet":
+            options["quiet"] = True
+        elif name == "port":
+            options["port"] = int(value)
+        elif name == "host":
+            options["host"] = value
+        else:
+            raise SystemExit(f"Unknown option {arg!r}")
+    return options
+
+
+if __name__ == "__main__":
+    options = parse_args(sys.argv[1:])
+    if options["quiet"]:
+        for module in (production_v1, deadline, retry_policy, movie_store, provider_cache, poster_store, metrics):
+            module.VERBOSE = False
+    web.run_app(create_app(), host=options["host"], port=options["port"])
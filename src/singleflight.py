@@ -0,0 +1,153 @@
+"""
+single-flight request coalescing. while a fetch for (operation, key) is running, identical callers wait for its
+result instead of firing their own TMDb/OMDb/Supabase calls. thread callers use do(), coroutines do_async(); both
+share one in-flight table, so a coroutine can join a fetch a worker thread started and the other way round.
+nothing is kept once the fetch finishes (that is the caches' job), and an error reaches every caller that joined.
+
+callers can carry different deadlines (deadline.py), so what one of them ran into is not passed on: a failure
+after the fetching caller's deadline ran out, or a result share_if() turns down (e.g. fetched degraded), makes
+the joined callers fetch for themselves. joined callers wait no longer than their own deadline allows.
+
+    @single_flight("omdb")                                   # keyed by the first argument
+    def get_omdb_data(imdb_id): ...
+
+    @single_flight("combined_data", key=lambda title, tmdb_id=None: tmdb_id or title, share_if=fetched_unhurried)
+    def get_combined_data(title, tmdb_id=None): ...
+"""
+import asyncio
+import functools
+import inspect
+import threading
+from concurrent.futures import CancelledError, Future, TimeoutError
+
+from deadline import DeadlineExceeded, current_deadline
+from metrics import COALESCED_CALLS
+from tracing import current_span
+
+
+def normalize(key):
+    # "The Matrix " and "the matrix" are one fetch, and so are 603 and "603"
+    if isinstance(key, str):
+        return " ".join(key.lower().split())
+    if isinstance(key, (tuple, list)):
+        return tuple(normalize(k) for k in key)
+    return key if key is None else str(key)
+
+
+def _copy(result):
+    # Joined callers get their own dict/list, since callers add fields to what they get back
+    return type(result)(result) if isinstance(result, (dict, list)) else result
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}  # (operation, normalized key) -> Future of the running fetch
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, operation, key):
+        call_key = (operation, normalize(key))
+        with self._lock:
+            future = self._calls.get(call_key)
+            if future is not None:
+                self.coalesced += 1
+                COALESCED_CALLS.inc(operation=operation)
+                current_span().set(coalesced=True)
+                return call_key, future, False
+            future = self._calls[call_key] = Future()
+            return call_key, future, True
+
+    def _finish(self, call_key, future, result=None, error=None, share=True):
+        with self._lock:
+            self._calls.pop(call_key, None)
+        if error is not None and not isinstance(error, Exception):
+            share = False  # the fetch itself was cancelled or interrupted
+        elif error is not None:
+            # Running out of the fetching caller's budget says nothing about the other callers' budgets
+            deadline = current_deadline()
+            share = not isinstance(error, DeadlineExceeded) and not (deadline and deadline.expired())
+        if not share:
+            future.cancel()  # whoever joined fetches again
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _wait_timeout(self, operation):
+        deadline = current_deadline()
+        if deadline is None:
+            return None
+        if deadline.expired():
+            raise DeadlineExceeded(f"deadline of {deadline.budget}s exceeded before joining {operation}")
+        return deadline.remaining()
+
+    def do(self, operation, key, fn, *args, share_if=None, **kwargs):
+        while True:
+            call_key, future, owner = self._join(operation, key)
+            if owner:
+                break
+            try:
+                return _copy(future.result(timeout=self._wait_timeout(operation)))
+            except CancelledError:
+                if not future.cancelled():
+                    raise
+            except TimeoutError:
+                raise DeadlineExceeded(f"deadline exceeded waiting for {operation}") from None
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(call_key, future, error=e)
+            raise
+        self._finish(call_key, future, result, share=share_if is None or share_if(result))
+        return result
+
+    async def do_async(self, operation, key, fn, *args, share_if=None, **kwargs):
+        while True:
+            call_key, future, owner = self._join(operation, key)
+            if owner:
+                break
+            try:
+                # shield: cancelling this caller must not cancel the fetch everyone else is waiting for
+                waiting = asyncio.shield(asyncio.wrap_future(future))
+                return _copy(await asyncio.wait_for(waiting, timeout=self._wait_timeout(operation)))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"deadline exceeded waiting for {operation}") from None
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(call_key, future, error=e)
+            raise
+        self._finish(call_key, future, result, share=share_if is None or share_if(result))
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+group = SingleFlight()
+
+
+def single_flight(operation, key=None, share_if=None):
+    # Decorator form; the key is the first argument unless a key function (same signature) is given.
+    # share_if(result) runs in the fetching caller's context; False makes the joined callers fetch for themselves
+    def decorator(func):
+        def key_of(args, kwargs):
+            if key is not None:
+                return key(*args, **kwargs)
+            return args[0] if args else next(iter(kwargs.values()), None)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await group.do_async(operation, key_of(args, kwargs), func, *args, share_if=share_if, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return group.do(operation, key_of(args, kwargs), func, *args, share_if=share_if, **kwargs)
+        return wrapper
+    return decorator
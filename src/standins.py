@@ -0,0 +1,743 @@
+"""
+offline stand-ins for every upstream production_v1 talks to, so the whole pipeline can run (and be benchmarked)
+without spending API quota:
+
+- TMDb search/discover/details/providers/keywords/genres, OMDb ratings and poster images are answered by an
+  in-process requests transport (plugged into http_client), built from the records in data/movie_cache;
+- OpenAI chat completions are deterministic: filters are extracted by keyword matching, recommendations and
+  fallback titles are built from the data;
+- Supabase is an in-memory PostgREST-style table store (movies, prompts, tmdb_keywords, tmdb_genres,
+  api_usage_log) seeded from the same files.
+
+every call sleeps for a latency drawn from its service's range and fails at the configured rate, so timings
+and retries/breakers/degradations behave like they do against the real services. a stand-in run never writes
+to data/: the movie replica, API usage log, traces and posters go to a scratch directory instead.
+
+    MOVIEMATCH_STANDINS=1                  use the stand-ins (installed when production_v1 is imported)
+    MOVIEMATCH_STANDIN_LATENCY_SCALE=1.0   multiply every latency range (0 = instant)
+    MOVIEMATCH_STANDIN_ERROR_RATE=0.0      fraction of calls that fail (5xx, 429, reset or timeout)
+    MOVIEMATCH_STANDIN_SEED=7              seed for latency and error draws
+    MOVIEMATCH_STANDIN_DIR=...             scratch directory for local files (default: a new temp dir per run)
+"""
+import copy
+import difflib
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import requests
+
+from bulk_loader import dedupe_records, load_cache_records, normalize_movie
+from config import WATCH_PROVIDER_MAP
+
+VERBOSE = True
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+MOVIE_CACHE_DIR = os.path.join(DATA_DIR, "movie_cache")
+GENRES_PATH = os.path.join(DATA_DIR, "tmdb_genres.json")
+KEYWORDS_PATH = os.path.join(DATA_DIR, "tmdb_keywords.json")
+POSTER_PATH = os.path.join(DATA_DIR, "templates", "poster.jpg")
+
+# Per-service latency ranges in ms, roughly what the real services show from a US region
+DEFAULT_LATENCY_MS = {
+    "tmdb": (40, 250),
+    "tmdb_images": (30, 150),
+    "omdb": (80, 600),
+    "openai": (700, 3500),
+    "supabase": (20, 120),
+}
+DISCOVER_PAGE_SIZE = 20
+
+
+class StandinConfig:
+    def __init__(self, latency_ms=None, latency_scale=None, error_rate=None, seed=None):
+        self.latency_ms = dict(DEFAULT_LATENCY_MS, **(latency_ms or {}))
+        self.latency_scale = float(os.getenv("MOVIEMATCH_STANDIN_LATENCY_SCALE", 1.0)) if latency_scale is None else latency_scale
+        self.error_rate = float(os.getenv("MOVIEMATCH_STANDIN_ERROR_RATE", 0.0)) if error_rate is None else error_rate
+        seed = int(os.getenv("MOVIEMATCH_STANDIN_SEED", 7)) if seed is None else seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def draw(self, service):
+        # (latency seconds, failure kind or None); skewed towards the low end like real latency distributions
+        low, high = self.latency_ms.get(service, (0, 0))
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            latency = (low + (high - low) * self._random.random() ** 2) * self.latency_scale / 1000
+            failure = None
+            if self._random.random() < self.error_rate:
+                failure = self._random.choice(("503", "429", "reset", "timeout"))
+        return latency, failure
+
+
+def _timeout_seconds(timeout):
+    if isinstance(timeout, tuple):
+        return sum(t for t in timeout if t)
+    return timeout
+
+
+def _stable_int(value, modulo):
+    return int(hashlib.md5(str(value).encode()).hexdigest()[:8], 16) % modulo
+
+
+class StandinData:
+    # Everything the stand-ins serve, derived from data/movie_cache plus the genre/keyword maps
+    def __init__(self):
+        records = dedupe_records(load_cache_records(MOVIE_CACHE_DIR))
+        self.movies = sorted((r for r in records if r.get("tmdb_id")), key=lambda r: r["tmdb_id"])
+        self.by_tmdb_id = {str(m["tmdb_id"]): m for m in self.movies}
+        self.by_imdb_id = {m["imdb_id"]: m for m in self.movies}
+        self.genres = self._load_json(GENRES_PATH)  # id -> name
+        self.genre_ids = {name: int(gid) for gid, name in self.genres.items()}
+        self.keywords = self._load_json(KEYWORDS_PATH)  # name -> id
+        self.keyword_names = {str(kid): name for name, kid in self.keywords.items()}
+
+    @staticmethod
+    def _load_json(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def vote_average(movie):
+        try:
+            return float(movie.get("imdb_rating"))
+        except (TypeError, ValueError):
+            return 6.0
+
+    @staticmethod
+    def vote_count(movie):
+        return 20 + _stable_int(movie["imdb_id"], 25000)
+
+    @staticmethod
+    def popularity(movie):
+        return round(1 + _stable_int(movie["imdb_id"] + "p", 5000) / 10, 1)
+
+    @staticmethod
+    def poster_path(movie):
+        return f"/{movie['tmdb_id']}.jpg"
+
+    def summary(self, movie):
+        return {
+            "id": movie["tmdb_id"],
+            "title": movie["title"],
+            "release_date": f"{movie.get('year') or '1900'}-01-01",
+            "genre_ids": [self.genre_ids[g] for g in movie.get("genres") or [] if g in self.genre_ids],
+            "overview": movie.get("plot"),
+            "poster_path": self.poster_path(movie),
+            "vote_average": self.vote_average(movie),
+            "vote_count": self.vote_count(movie),
+            "popularity": self.popularity(movie),
+        }
+
+    def details(self, movie):
+        return {
+            **self.summary(movie),
+            "imdb_id": movie["imdb_id"],
+            "genres": [{"id": self.genre_ids.get(g), "name": g} for g in movie.get("genres") or []],
+            "runtime": movie.get("runtime"),
+        }
+
+    def credits(self, movie):
+        return {
+            "cast": [{"name": name, "order": i} for i, name in enumerate(movie.get("cast") or [])],
+            "crew": [{"job": "Director", "name": movie.get("director") or "Unknown"}],
+        }
+
+    def keyword_matches(self, movie, keyword_id):
+        name = self.keyword_names.get(str(keyword_id))
+        if not name:
+            return False
+        text = f"{movie.get('title', '')} {movie.get('plot') or ''}".lower()
+        return name.lower() in text
+
+    def offers_provider(self, movie, provider_id):
+        name = WATCH_PROVIDER_MAP.get(str(provider_id))
+        if not name:
+            return False
+        services = movie.get("streaming_services") or []
+        return any(s == name or s.startswith(name) for s in services)
+
+
+def _matches_id_list(value, test):
+    # TMDb id lists: "a,b" means all of them, "a|b" any of them
+    value = str(value)
+    if "|" in value:
+        return any(test(v) for v in value.split("|") if v)
+    return all(test(v) for v in value.split(",") if v)
+
+
+######### TMDb / OMDb / images transport #########
+
+class StandinSession:
+    # Drop-in for requests.Session as used by http_client: only get() is needed
+    def __init__(self, service, data, config):
+        self.service = service
+        self.data = data
+        self.config = config
+
+    def close(self):
+        pass
+
+    def get(self, url, params=None, headers=None, timeout=None, **kwargs):
+        latency, failure = self.config.draw(self.service)
+        limit = _timeout_seconds(timeout)
+        if failure == "timeout" or (limit is not None and latency > limit):
+            time.sleep(limit if limit is not None else latency)
+            raise requests.ReadTimeout(f"stand-in {self.service} timed out")
+        time.sleep(latency)
+        if failure == "reset":
+            raise requests.ConnectionError(f"stand-in {self.service} connection reset")
+        if failure == "503":
+            return self._response(url, 503, {"status_message": "Service unavailable"})
+        if failure == "429":
+            return self._response(url, 429, {"status_message": "Too many requests"}, headers={"Retry-After": "1"})
+
+        parsed = urlparse(url)
+        params = {k: str(v) for k, v in (params or {}).items()}
+        if parsed.netloc == "image.tmdb.org":
+            with open(POSTER_PATH, "rb") as f:
+                return self._response(url, 200, f.read(), content_type="image/jpeg")
+        if "omdbapi.com" in parsed.netloc:
+            return self._response(url, 200, self._omdb(params))
+        status, body = self._tmdb(parsed.path, params)
+        return self._response(url, status, body)
+
+    @staticmethod
+    def _response(url, status, body, content_type="application/json", headers=None):
+        r = requests.Response()
+        r.status_code = status
+        r.url = url
+        r._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        r.headers["Content-Type"] = content_type
+        r.headers.update(headers or {})
+        r.reason = "OK" if status < 400 else "Stand-in error"
+        return r
+
+    def _omdb(self, params):
+        movie = self.data.by_imdb_id.get(params.get("i"))
+        if not movie:
+            return {"Response": "False", "Error": "Incorrect IMDb ID."}
+        ratings = [{"Source": "Internet Movie Database", "Value": f"{movie.get('imdb_rating')}/10"}]
+        if movie.get("rotten_tomatoes"):
+            ratings.append({"Source": "Rotten Tomatoes", "Value": movie["rotten_tomatoes"]})
+        return {
+            "Title": movie["title"],
+            "Year": str(movie.get("year")),
+            "imdbID": movie["imdb_id"],
+            "imdbRating": movie.get("imdb_rating") or "N/A",
+            "Metascore": movie.get("metascore") or "N/A",
+            "Ratings": ratings,
+            "Response": "True",
+        }
+
+    def _tmdb(self, path, params):
+        path = re.sub(r"^/3", "", path)
+        not_found = (404, {"status_code": 34, "status_message": "The resource you requested could not be found."})
+        if path == "/search/movie":
+            return 200, {"page": 1, "results": self._search(params.get("query", ""))}
+        if path == "/discover/movie":
+            return 200, self._discover(params)
+        if path == "/search/keyword":
+            query = params.get("query", "").lower()
+            results = [{"id": kid, "name": name} for name, kid in self.data.keywords.items() if query and query in name.lower()]
+            results.sort(key=lambda k: (k["name"].lower() != query, len(k["name"])))
+            return 200, {"page": 1, "results": results}
+        if path == "/genre/movie/list":
+            return 200, {"genres": [{"id": int(gid), "name": name} for gid, name in self.data.genres.items()]}
+        match = re.fullmatch(r"/movie/(\d+)(/watch/providers)?", path)
+        if match:
+            movie = self.data.by_tmdb_id.get(match.group(1))
+            if not movie:
+                return not_found
+            if match.group(2):
+                services = movie.get("streaming_services") or []
+                results = {"US": {"flatrate": [{"provider_name": s} for s in services]}} if services else {}
+                return 200, {"id": movie["tmdb_id"], "results": results}
+            body = self.data.details(movie)
+            if "credits" in params.get("append_to_response", ""):
+                body["credits"] = self.data.credits(movie)
+            return 200, body
+        return not_found
+
+    def _search(self, query):
+        query = query.lower().strip()
+        if not query:
+            return []
+        scored = []
+        for movie in self.data.movies:
+            title = movie["title"].lower()
+            if query in title or title in query:
+                score = 1 + difflib.SequenceMatcher(None, query, title).ratio()
+            else:
+                score = difflib.SequenceMatcher(None, query, title).ratio()
+                if score < 0.75:
+                    continue
+            scored.append((score, self.data.popularity(movie), movie))
+        scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+        return [self.data.summary(m) for _, _, m in scored[:20]]
+
+    def _discover(self, params):
+        data = self.data
+        movies = data.movies
+        if params.get("with_genres"):
+            movies = [m for m in movies if _matches_id_list(
+                params["with_genres"], lambda g: data.genres.get(g) in (m.get("genres") or []))]
+        if params.get("without_genres"):
+            excluded = {data.genres.get(g) for g in re.split(r"[,|]", params["without_genres"])}
+            movies = [m for m in movies if not excluded & set(m.get("genres") or [])]
+        if params.get("with_keywords"):
+            movies = [m for m in movies if _matches_id_list(params["with_keywords"], lambda k: data.keyword_matches(m, k))]
+        if params.get("with_watch_providers"):
+            movies = [m for m in movies if _matches_id_list(params["with_watch_providers"], lambda p: data.offers_provider(m, p))]
+        if params.get("primary_release_year"):
+            movies = [m for m in movies if str(m.get("year")) == params["primary_release_year"]]
+        if params.get("vote_average.gte"):
+            movies = [m for m in movies if data.vote_average(m) >= float(params["vote_average.gte"])]
+        if params.get("vote_count.gte"):
+            movies = [m for m in movies if data.vote_count(m) >= float(params["vote_count.gte"])]
+
+        sort_by = params.get("sort_by", "popularity.desc")
+        field, _, direction = sort_by.partition(".")
+        key = {"vote_average": data.vote_average, "vote_count": data.vote_count}.get(field, data.popularity)
+        movies = sorted(movies, key=key, reverse=direction != "asc")
+
+        page = max(1, int(params.get("page", 1)))
+        start = (page - 1) * DISCOVER_PAGE_SIZE
+        return {
+            "page": page,
+            "results": [data.summary(m) for m in movies[start:start + DISCOVER_PAGE_SIZE]],
+            "total_results": len(movies),
+            "total_pages": max(1, -(-len(movies) // DISCOVER_PAGE_SIZE)),
+        }
+
+
+######### OpenAI #########
+
+# Words people use for a genre without naming it
+GENRE_SYNONYMS = {
+    "scary": "Horror", "spooky": "Horror", "funny": "Comedy", "hilarious": "Comedy", "sci-fi": "Science Fiction",
+    "scifi": "Science Fiction", "space": "Science Fiction", "romantic": "Romance", "love story": "Romance",
+    "animated": "Animation", "cartoon": "Animation", "kids": "Family", "detective": "Mystery", "suspense": "Thriller",
+    "war": "War", "cowboy": "Western", "documentary": "Documentary", "true story": "History",
+}
+PLATFORM_ALIASES = {
+    "netflix": "8", "prime": "9", "amazon": "9", "hulu": "15", "hbo": "384", "max": "384",
+    "disney": "337", "peacock": "531", "paramount": "350", "apple tv": "387",
+}
+HIGHLY_RATED_WORDS = ("highly rated", "best", "top rated", "acclaimed", "masterpiece", "great")
+
+
+class _Completions:
+    def __init__(self, data, config):
+        self.data = data
+        self.config = config
+
+    def create(self, model=None, messages=None, temperature=None, timeout=None, **kwargs):
+        latency, failure = self.config.draw("openai")
+        if failure == "timeout" or (timeout is not None and latency > timeout):
+            time.sleep(timeout if timeout is not None else latency)
+            raise TimeoutError("stand-in OpenAI request timed out")
+        time.sleep(latency)
+        if failure:
+            raise ConnectionError(f"stand-in OpenAI request failed ({failure})")
+
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in messages if m["role"] == "user"), "")
+        if "Extract a TMDb-compatible movie filter" in system:
+            content = repr(self._extract_filters(user))
+        elif "recommending 5 great films" in system:
+            content = self._recommend(user)
+        else:
+            content = self._fallback_titles(user)
+
+        prompt_tokens = sum(len(m["content"].split()) for m in messages) * 4 // 3
+        completion_tokens = len(content.split()) * 4 // 3
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop", message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def _extract_filters(self, prompt):
+        text = prompt.lower()
+        filters = {}
+        genres = [gid for gid, name in self.data.genres.items() if re.search(rf"\b{re.escape(name.lower())}\b", text)]
+        genres += [str(self.data.genre_ids[g]) for word, g in GENRE_SYNONYMS.items() if word in text and g in self.data.genre_ids]
+        if genres:
+            filters["with_genres"] = ",".join(dict.fromkeys(genres))
+        platforms = [pid for alias, pid in PLATFORM_ALIASES.items() if re.search(rf"\b{re.escape(alias)}\b", text)]
+        if platforms:
+            filters["with_watch_providers"] = "|".join(dict.fromkeys(platforms))
+        year = re.search(r"\b(19\d\d|20\d\d)\b", text)
+        if year:
+            filters["primary_release_year"] = int(year.group(1))
+        if any(word in text for word in HIGHLY_RATED_WORDS):
+            filters["vote_average.gte"] = 7
+        keywords = [name for name in self.data.keywords if len(name) > 3 and re.search(rf"\b{re.escape(name)}\b", text)]
+        if keywords:
+            filters["with_keywords"] = ",".join(keywords[:3])
+        return filters
+
+    @staticmethod
+    def _recommend(user_message):
+        _, _, listing = user_message.partition("movie options:\n")
+        try:
+            movies = json.loads(listing)
+        except ValueError:
+            movies = []
+        lines = ["Here are five picks for you:"]
+        for i, movie in enumerate(movies[:5], 1):
+            genres = ", ".join(movie.get("genres") or []) or "film"
+            rating = movie.get("imdb_rating") or "unrated"
+            services = ", ".join(movie.get("streaming_services") or []) or "check local listings"
+            lines.append(f"{i}. {movie.get('title')} ({movie.get('year')}) — a {genres.lower()} pick, IMDb {rating}. Watch on: {services}.")
+        if len(lines) == 1:
+            lines.append("I couldn't find strong matches, but try browsing recent popular releases.")
+        return "\n".join(lines)
+
+    def _fallback_titles(self, user_message):
+        # Movies sharing the most words with the prompt, most popular first
+        words = set(re.findall(r"[a-z]{4,}", user_message.lower()))
+
+        def overlap(movie):
+            text = f"{movie['title']} {movie.get('plot') or ''} {' '.join(movie.get('genres') or [])}".lower()
+            return len(words & set(re.findall(r"[a-z]{4,}", text))), self.data.popularity(movie)
+
+        picks = sorted(self.data.movies, key=overlap, reverse=True)[:6]
+        return "\n".join(m["title"] for m in picks)
+
+
+class StandinOpenAI:
+    # Mirrors the bits of the openai module/client we use: openai.chat.completions.create(...)
+    def __init__(self, data, config):
+        self.chat = SimpleNamespace(completions=_Completions(data, config))
+        self.api_key = "stand-in"
+
+
+######### Supabase #########
+
+TABLE_KEYS = {
+    "movies": "imdb_id",
+    "prompts": "id",
+    "tmdb_keywords": "keyword_name",
+    "tmdb_genres": "genre_id",
+    "api_usage_log": "date",
+}
+
+
+class StandinAPIError(Exception):
+    pass
+
+
+def _coerce(value, like):
+    # PostgREST compares typed columns; filter values arrive as strings
+    if value is None or like is None or isinstance(value, type(like)):
+        return value
+    try:
+        if isinstance(like, bool):
+            return str(value).lower() == "true"
+        if isinstance(like, int):
+            return int(value)
+        if isinstance(like, float):
+            return float(value)
+    except (TypeError, ValueError):
+        return value
+    return str(value)
+
+
+def _compare(row_value, op, value):
+    if op == "is":
+        token = str(value).lower()
+        if token == "null" or value is None:
+            return row_value is None
+        return row_value is (token == "true")
+    if op == "cs":
+        return set(value) <= set(row_value or [])
+    if op == "in":
+        return row_value in [_coerce(v, row_value) for v in value]
+    if row_value is None:
+        return False
+    value = _coerce(value, row_value)
+    if op in ("like", "ilike"):
+        pattern = "^" + re.escape(str(value)).replace("%", ".*").replace(r"\*", ".*") + "$"
+        return re.match(pattern, str(row_value), re.IGNORECASE if op == "ilike" else 0) is not None
+    try:
+        return {
+            "eq": row_value == value, "neq": row_value != value,
+            "gt": row_value > value, "gte": row_value >= value,
+            "lt": row_value < value, "lte": row_value <= value,
+        }[op]
+    except TypeError:
+        return False
+    except KeyError:
+        raise StandinAPIError(f"unsupported filter operator {op!r}")
+
+
+def _split_top_level(expr):
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_logic(expr, combine=any):
+    # PostgREST logic trees: "a.gt.1,and(b.eq.\"x\",c.lt.2)" -> predicate(row)
+    tests = []
+    for part in _split_top_level(expr):
+        part = part.strip()
+        group = re.fullmatch(r"(not\.)?(and|or)\((.*)\)", part)
+        if group:
+            inner = _parse_logic(group.group(3), all if group.group(2) == "and" else any)
+            tests.append((lambda t: lambda row: not t(row))(inner) if group.group(1) else inner)
+            continue
+        column, op, value = part.split(".", 2)
+        negate = op == "not"
+        if negate:
+            op, value = value.split(".", 1)
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        tests.append((lambda c, o, v, n: lambda row: _compare(row.get(c), o, v) != n)(column, op, value, negate))
+    return lambda row: combine(t(row) for t in tests)
+
+
+class _Query:
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+        self.action = "select"
+        self.columns = None
+        self.payload = None
+        self.on_conflict = None
+        self.tests = []
+        self.ordering = []
+        self.row_limit = None
+        self.row_offset = 0
+        self._negate_next = False
+
+    # --- actions ---
+    def select(self, columns="*", count=None):
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, **kwargs):
+        self.action, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values, **kwargs):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    # --- filters ---
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def _add(self, column, op, value):
+        negate, self._negate_next = self._negate_next, False
+        self.tests.append(lambda row: _compare(row.get(column), op, value) != negate)
+        return self
+
+    def eq(self, column, value): return self._add(column, "eq", value)
+    def neq(self, column, value): return self._add(column, "neq", value)
+    def gt(self, column, value): return self._add(column, "gt", value)
+    def gte(self, column, value): return self._add(column, "gte", value)
+    def lt(self, column, value): return self._add(column, "lt", value)
+    def lte(self, column, value): return self._add(column, "lte", value)
+    def like(self, column, value): return self._add(column, "like", value)
+    def ilike(self, column, value): return self._add(column, "ilike", value)
+    def is_(self, column, value): return self._add(column, "is", value)
+    def in_(self, column, values): return self._add(column, "in", list(values))
+    def contains(self, column, values): return self._add(column, "cs", list(values))
+
+    def filter(self, column, operator, value):
+        if operator.startswith("not."):
+            self._negate_next = True
+            operator = operator[4:]
+        return self._add(column, operator, value)
+
+    def or_(self, expr, **kwargs):
+        test = _parse_logic(expr)
+        self.tests.append(test)
+        return self
+
+    # --- modifiers ---
+    def order(self, column, desc=False, **kwargs):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, n, **kwargs):
+        self.row_limit = n
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def execute(self):
+        return self.store.execute(self)
+
+
+class StandinSupabase:
+    def __init__(self, data, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._next_id = {}
+        self.tables = {name: {} for name in TABLE_KEYS}
+        for movie in data.movies:
+            row = normalize_movie(movie, updated_at="2024-01-01T00:00:00")
+            row["poster_url"] = f"https://image.tmdb.org/t/p/w500{data.poster_path(movie)}"
+            self.tables["movies"][row["imdb_id"]] = row
+        for name, kid in data.keywords.items():
+            self.tables["tmdb_keywords"][name] = {"keyword_name": name, "keyword_id": kid}
+        for gid, name in data.genres.items():
+            self.tables["tmdb_genres"][int(gid)] = {"genre_id": int(gid), "genre_name": name}
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def execute(self, query):
+        latency, failure = self.config.draw("supabase")
+        time.sleep(latency)
+        if failure:
+            raise StandinAPIError(f"stand-in Supabase request failed ({failure})")
+        with self._lock:
+            rows = self.tables.setdefault(query.table, {})
+            if query.action == "select":
+                data = self._select(rows, query)
+            elif query.action in ("insert", "upsert"):
+                data = self._write(rows, query)
+            else:
+                matched = [key for key, row in rows.items() if all(t(row) for t in query.tests)]
+                data = []
+                for key in matched:
+                    if query.action == "update":
+                        rows[key].update(query.payload)
+                        data.append(copy.deepcopy(rows[key]))
+                    else:
+                        data.append(rows.pop(key))
+        return SimpleNamespace(data=data, count=len(data))
+
+    def _select(self, rows, query):
+        found = [row for row in rows.values() if all(t(row) for t in query.tests)]
+        for column, desc in reversed(query.ordering):
+            # Nulls last, like PostgREST's default for ascending order
+            found.sort(key=lambda r: (r.get(column) is None, r.get(column) if r.get(column) is not None else 0), reverse=desc)
+        end = None if query.row_limit is None else query.row_offset + query.row_limit
+        found = found[query.row_offset:end]
+        if query.columns:
+            found = [{c: row.get(c) for c in query.columns} for row in found]
+        return copy.deepcopy(found)
+
+    def _write(self, rows, query):
+        key_column = query.on_conflict or TABLE_KEYS.get(query.table, "id")
+        payload = query.payload if isinstance(query.payload, list) else [query.payload]
+        written = []
+        for row in payload:
+            row = copy.deepcopy(row)
+            if key_column == "id" and row.get("id") is None:
+                self._next_id[query.table] = self._next_id.get(query.table, 0) + 1
+                row["id"] = self._next_id[query.table]
+            key = row.get(key_column)
+            if key in rows:
+                if query.action == "insert":
+                    raise StandinAPIError(f"duplicate key value violates unique constraint on {query.table}.{key_column}")
+                rows[key].update(row)
+            else:
+                rows[key] = row
+            written.append(copy.deepcopy(rows[key]))
+        return written
+
+
+######### wiring #########
+
+_installed = None
+_install_lock = threading.Lock()
+_scratch_dir = None
+_scratch_lock = threading.Lock()
+
+
+def scratch_path(name):
+    # Where a stand-in run keeps a file that would otherwise land in data/
+    global _scratch_dir
+    with _scratch_lock:
+        if _scratch_dir is None:
+            _scratch_dir = os.getenv("MOVIEMATCH_STANDIN_DIR") or tempfile.mkdtemp(prefix="moviematch-standins-")
+            os.makedirs(_scratch_dir, exist_ok=True)
+    return os.path.join(_scratch_dir, name)
+
+
+def _redirect_local_files():
+    # Stand-in movies and sync marks must never reach the production replica, nor fake posters the poster store
+    import movie_store
+    import poster_store
+    import tracing
+
+    movie_store.REPLICA_PATH = scratch_path("movie_replica.sqlite3")
+    poster_store.POSTER_DIR = scratch_path("posters")
+    poster_store.OBJECTS_DIR = os.path.join(poster_store.POSTER_DIR, "objects")
+    poster_store.INDEX_DIR = os.path.join(poster_store.POSTER_DIR, "index")
+    tracing.exporter.directory = scratch_path("traces")
+
+
+def install(config=None):
+    # Routes http_client through the stand-ins, moves local files to the scratch directory and returns
+    # (supabase, openai) replacements. Idempotent; production_v1 calls it on import when MOVIEMATCH_STANDINS is set.
+    global _installed
+    import http_client
+
+    with _install_lock:
+        if _installed is None:
+            _redirect_local_files()
+            config = config or StandinConfig()
+            data = StandinData()
+            http_client.set_session_factory(lambda service: StandinSession(service, data, config))
+            _installed = SimpleNamespace(
+                config=config, data=data,
+                supabase=StandinSupabase(data, config), openai=StandinOpenAI(data, config),
+            )
+            if VERBOSE:
+                print(
+                    f"[STANDIN] Serving TMDb/OMDb/OpenAI/Supabase locally from {len(data.movies)} cached movies "
+                    f"(latency x{config.latency_scale}, error rate {config.error_rate}); local files in {_scratch_dir}"
+                )
+    return _installed.supabase, _installed.openai
+
+
+def standin_stats():
+    return dict(_installed.config.calls) if _installed else {}
@@ -0,0 +1,270 @@
+"""
+lightweight request tracing. a trace is started per recommendation with start_trace(); span() opens a child of
+whatever span is current (a context variable, so it follows asyncio tasks and asyncio.to_thread hops), and is a
+no-op outside a trace so scripts pay nothing. when the root span ends the whole trace is appended as JSON lines
+to data/traces/, one span per line, using OpenTelemetry's field names (traceId, spanId, parentSpanId,
+startTimeUnixNano, ...), so the files can be replayed into an OTLP collector later. spans still running when
+the root ends (work abandoned at the deadline) are not exported; the gap shows up in the parent instead.
+
+    python tracing.py                 # the 10 slowest traces recorded today
+    python tracing.py <trace_id>      # span tree of one trace with durations and attributes
+    python tracing.py <trace_id> 2024-05-01   # ...recorded on another day
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime
+
+VERBOSE = True
+
+TRACE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "traces"))
+ENABLED = os.getenv("MOVIEMATCH_TRACING", "1").lower() not in ("0", "false", "no")
+MAX_ATTRIBUTE_LENGTH = 200
+
+
+def _clean(value):
+    # Attributes stay small and JSON-friendly
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value[:20]]
+    value = str(value)
+    return value if len(value) <= MAX_ATTRIBUTE_LENGTH else value[:MAX_ATTRIBUTE_LENGTH] + "…"
+
+
+class Span:
+    def __init__(self, trace, name, parent_id=None, attributes=None, start_ns=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = {k: _clean(v) for k, v in (attributes or {}).items()}
+        self.events = []
+        self.status = "OK"
+        self.error = None
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def set(self, **attributes):
+        for key, value in attributes.items():
+            self.attributes[key] = _clean(value)
+        return self
+
+    def incr(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+        return self
+
+    def event(self, name, **attributes):
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": {k: _clean(v) for k, v in attributes.items()}})
+        return self
+
+    def fail(self, exc):
+        self.status = "ERROR"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self, end_ns=None):
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            self.trace.finished(self)
+
+    def duration_ms(self):
+        return round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 2)
+
+    def to_dict(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": self.duration_ms(),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status, "message": self.error},
+        }
+
+
+class _NoopSpan:
+    # Returned outside a trace; accepts everything and records nothing
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes):
+        return self
+
+    def incr(self, key, amount=1):
+        return self
+
+    def event(self, name, **attributes):
+        return self
+
+    def fail(self, exc):
+        pass
+
+    def end(self, end_ns=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, exporter):
+        self.trace_id = secrets.token_hex(16)
+        self.exporter = exporter
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def finished(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+
+class JSONLinesExporter:
+    def __init__(self, directory=TRACE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def path_for(self, day=None):
+        return os.path.join(self.directory, f"traces-{day or datetime.now().strftime('%Y-%m-%d')}.jsonl")
+
+    def export(self, trace):
+        lines = "".join(json.dumps(span.to_dict()) + "\n" for span in sorted(trace.spans, key=lambda s: s.start_ns))
+        try:
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self.path_for(), "a") as f:
+                    f.write(lines)
+        except OSError as e:
+            if VERBOSE:
+                print(f"[ERROR] Failed to export trace {trace.trace_id}: {e}")
+
+
+exporter = JSONLinesExporter()
+_current = contextvars.ContextVar("span", default=None)
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+def current_trace_id():
+    return current_span().trace_id
+
+
+@contextlib.contextmanager
+def start_trace(name, **attributes):
+    # Root span of a new trace; exported as a whole when it ends
+    if not ENABLED:
+        yield NOOP_SPAN
+        return
+    trace = Trace(exporter)
+    root = Span(trace, name, attributes=attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        root.end()
+        trace.exporter.export(trace)
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(parent.trace, name, parent_id=parent.span_id, attributes=attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def record_span(name, start_ns, end_ns, **attributes):
+    # A span measured elsewhere (e.g. pipeline stage timings), as a child of the current span
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    recorded = Span(parent.trace, name, parent_id=parent.span_id, attributes=attributes, start_ns=start_ns)
+    recorded.end(end_ns)
+    return recorded
+
+
+def traced(name=None):
+    # Decorator form of span(); the span is named after the function unless given
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+######### reading traces back #########
+
+def load_spans(day=None):
+    path = exporter.path_for(day)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def slowest_traces(spans, n=10):
+    roots = [s for s in spans if not s["parentSpanId"]]
+    return sorted(roots, key=lambda s: s["durationMs"], reverse=True)[:n]
+
+
+def print_trace(spans, trace_id):
+    spans = [s for s in spans if s["traceId"] == trace_id]
+    if not spans:
+        print(f"[TRACE] No spans for trace {trace_id}")
+        return
+    children = {}
+    for s in spans:
+        children.setdefault(s["parentSpanId"], []).append(s)
+    trace_start = min(s["startTimeUnixNano"] for s in spans)
+
+    def walk(parent_id, depth):
+        for s in sorted(children.get(parent_id, []), key=lambda s: s["startTimeUnixNano"]):
+            offset = (s["startTimeUnixNano"] - trace_start) / 1e6
+            attributes = " ".join(f"{k}={v}" for k, v in s["attributes"].items())
+            error = f"  !! {s['status']['message']}" if s["status"]["code"] == "ERROR" else ""
+            print(f"{offset:>9.1f} {s['durationMs']:>9.1f} ms  {'  ' * depth}{s['name']}  {attributes}{error}")
+            walk(s["spanId"], depth + 1)
+
+    print(f"{'start ms':>9} {'duration':>12}  span")
+    walk(None, 0)
+
+
+if __name__ == "__main__":
+    all_spans = load_spans(sys.argv[2] if len(sys.argv) > 2 else None)
+    if len(sys.argv) > 1:
+        print_trace(all_spans, sys.argv[1])
+    else:
+        for root in slowest_traces(all_spans):
+            print(f"{root['traceId']}  {root['durationMs']:>9.1f} ms  {root['attributes'].get('prompt', '')}")